@@ -0,0 +1,252 @@
+import argparse
+import csv
+import os
+import random
+from array import array
+
+import degrees
+import graph as compact_graph
+from landmarks import UNREACHABLE, graph_distances
+
+# Number of sources searched together by one multi-source BFS, one bit each
+BATCH = 64
+
+
+def multi_source_bfs(graph, sources):
+    """
+    Breadth-first search from several person indices at once.
+
+    Each person keeps a bitset of the sources that have reached them, so
+    a single sweep over the graph per level advances every search.
+    Returns, for each source, a list counting the people at each distance.
+    """
+    po, pm = graph.person_offsets, graph.person_movies
+    mo, mp = graph.movie_offsets, graph.movie_people
+    seen = [0] * len(graph.person_ids)
+    seen_movies = [0] * len(graph.movie_ids)
+
+    histograms = [[1] for _ in sources]
+    frontier = {}
+    for bit, source in enumerate(sources):
+        seen[source] |= 1 << bit
+        frontier[source] = frontier.get(source, 0) | 1 << bit
+
+    while frontier:
+
+        # Collect which searches arrive at each movie, skipping searches
+        # that already expanded it
+        movie_masks = {}
+        for person, mask in frontier.items():
+            for movie in pm[po[person]:po[person + 1]]:
+                mask_movie = mask & ~seen_movies[movie]
+                if mask_movie:
+                    seen_movies[movie] |= mask_movie
+                    movie_masks[movie] = movie_masks.get(movie, 0) | mask_movie
+
+        next_frontier = {}
+        for movie, mask in movie_masks.items():
+            for person in mp[mo[movie]:mo[movie + 1]]:
+                new = mask & ~seen[person]
+                if new:
+                    seen[person] |= new
+                    next_frontier[person] = next_frontier.get(person, 0) | new
+
+        # Count newly reached people for each search
+        counts = [0] * len(sources)
+        for mask in next_frontier.values():
+            while mask:
+                low = mask & -mask
+                counts[low.bit_length() - 1] += 1
+                mask ^= low
+        for bit, count in enumerate(counts):
+            if count:
+                histograms[bit].append(count)
+        frontier = next_frontier
+
+    return histograms
+
+
+def multi_source_bfs_worker(sources):
+    """
+    Run `multi_source_bfs` in a pool worker.
+    """
+    return multi_source_bfs(compact_graph.worker_graph, sources)
+
+
+def separations(graph, sources, processes=None):
+    """
+    Return a histogram of distances for each person index in `sources`,
+    searching in batches.
+
+    With `processes` None or 1, batches are searched in this process;
+    otherwise they are spread across a pool of that many worker
+    processes, as in `graph.shortest_paths`.
+    """
+    batches = [sources[i:i + BATCH] for i in range(0, len(sources), BATCH)]
+    if processes is None or processes == 1:
+        results = [multi_source_bfs(graph, batch) for batch in batches]
+    else:
+        with compact_graph.worker_pool(graph, processes) as pool:
+            results = pool.map(multi_source_bfs_worker, batches)
+    return [histogram for result in results for histogram in result]
+
+
+def components(graph):
+    """
+    Label the connected components of the graph.
+    Returns (labels, sizes), where `labels[p]` is the component of person
+    index `p` and `sizes[c]` is the number of people in component `c`.
+    """
+    po, pm = graph.person_offsets, graph.person_movies
+    mo, mp = graph.movie_offsets, graph.movie_people
+    labels = array("i", [-1]) * len(graph.person_ids)
+    seen_movies = bytearray(len(graph.movie_ids))
+    sizes = []
+
+    for start in range(len(labels)):
+        if labels[start] != -1:
+            continue
+        component = len(sizes)
+        labels[start] = component
+        frontier = [start]
+        size = 1
+        while frontier:
+            next_frontier = []
+            for person in frontier:
+                for movie in pm[po[person]:po[person + 1]]:
+                    if seen_movies[movie]:
+                        continue
+                    seen_movies[movie] = 1
+                    for neighbor in mp[mo[movie]:mo[movie + 1]]:
+                        if labels[neighbor] == -1:
+                            labels[neighbor] = component
+                            next_frontier.append(neighbor)
+            size += len(next_frontier)
+            frontier = next_frontier
+        sizes.append(size)
+
+    return labels, sizes
+
+
+def double_sweep(graph, start):
+    """
+    Lower bound on the diameter of the component containing person index
+    `start`: search from `start`, then again from the farthest person found.
+    Returns (distance, person, farthest) for the second sweep.
+    """
+    distances = graph_distances(graph, start)
+    person = farthest(distances)
+    distances = graph_distances(graph, person)
+    end = farthest(distances)
+    return distances[end], person, end
+
+
+def farthest(distances):
+    """
+    Return the index of the largest reachable distance.
+    """
+    best, best_distance = 0, -1
+    for person, distance in enumerate(distances):
+        if distance != UNREACHABLE and distance > best_distance:
+            best, best_distance = person, distance
+    return best
+
+
+def write_csv(filename, header, rows):
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Graph-wide statistics for the degrees data."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("output", help="directory for the CSV reports")
+    parser.add_argument("--source", action="append", default=[],
+                        help="name or id to report separations from")
+    parser.add_argument("--samples", type=int, default=BATCH,
+                        help="random people to estimate eccentricity from")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=True)
+    graph = degrees.graph
+    print("Data loaded.")
+    os.makedirs(args.output, exist_ok=True)
+
+    sources = []
+    for name in args.source:
+        if name in degrees.people:
+            person_id = name
+        else:
+            person_id = degrees.person_id_for_name(name)
+        if person_id is None:
+            raise SystemExit(f"Person not found: {name}")
+        sources.append(graph.person_index(person_id))
+
+    # Connected components, largest first
+    print("Finding components...")
+    labels, sizes = components(graph)
+    examples = {}
+    for person, component in enumerate(labels):
+        examples.setdefault(component, person)
+    order = sorted(range(len(sizes)), key=lambda c: sizes[c], reverse=True)
+    write_csv(
+        os.path.join(args.output, "components.csv"),
+        ["component", "size", "example_id", "example_name"],
+        ([rank, sizes[c], graph.person_ids[examples[c]],
+          graph.person_names[examples[c]]] for rank, c in enumerate(order))
+    )
+
+    # Separation histograms for requested and sampled people
+    rng = random.Random(args.seed)
+    largest = order[0] if order else None
+    candidates = [p for p, c in enumerate(labels) if c == largest]
+    samples = rng.sample(candidates, min(args.samples, len(candidates)))
+    print(f"Searching from {len(sources) + len(samples)} people...")
+    histograms = separations(graph, sources + samples, args.processes)
+
+    write_csv(
+        os.path.join(args.output, "separations.csv"),
+        ["source_id", "name", "distance", "count"],
+        ([graph.person_ids[source], graph.person_names[source],
+          distance, count]
+         for source, histogram in zip(sources, histograms)
+         for distance, count in enumerate(histogram))
+    )
+    write_csv(
+        os.path.join(args.output, "eccentricity.csv"),
+        ["source_id", "name", "eccentricity", "reachable"],
+        ([graph.person_ids[source], graph.person_names[source],
+          len(histogram) - 1, sum(histogram)]
+         for source, histogram in zip(sources + samples, histograms))
+    )
+
+    # Diameter lower bound from the sampled eccentricities and a double
+    # sweep through the largest component
+    diameter = max((len(h) - 1 for h in histograms), default=0)
+    if candidates:
+        sweep, _, _ = double_sweep(graph, candidates[0])
+        diameter = max(diameter, sweep)
+    write_csv(
+        os.path.join(args.output, "summary.csv"),
+        ["metric", "value"],
+        [
+            ["people", len(graph.person_ids)],
+            ["movies", len(graph.movie_ids)],
+            ["components", len(sizes)],
+            ["largest_component", sizes[largest] if sizes else 0],
+            ["diameter_lower_bound", diameter]
+        ]
+    )
+    print(f"Reports written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import csv
 import sys
 
+import graph as compact_graph
+from graph import MoviesView, NamesView, PeopleView
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,11 +14,34 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed graph backing the maps above, if loaded in compact form
+graph = None
 
-def load_data(directory):
+
+def load_data(directory, compact=False, cache=True):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, the data is held in a `graph.Graph` and
+    `names`, `people` and `movies` become read-only views of it.
+    With `cache`, the compact graph is memory-mapped from a snapshot in
+    `directory`, which is written on first load and rebuilt whenever
+    any of the CSV files change.
+
+    Returns a dictionary counting the stars rows read, and those dropped
+    for naming an unknown person or movie, or for repeating an earlier row.
     """
+    global graph, names, people, movies
+    if compact:
+        graph = compact_graph.load(directory, cache=cache)
+        names = NamesView(graph)
+        people = PeopleView(graph)
+        movies = MoviesView(graph)
+        return graph.stats
+    if graph is not None:
+        graph = None
+        names, people, movies = {}, {}, {}
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -42,25 +67,44 @@ def load_data(directory):
             }
 
     # Load stars
+    stats = {"rows": 0, "dropped": 0, "unknown_person": 0,
+             "unknown_movie": 0, "duplicate": 0}
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+            stats["rows"] += 1
+            person = people.get(row["person_id"])
+            movie = movies.get(row["movie_id"])
+            if person is None:
+                stats["unknown_person"] += 1
+            if movie is None:
+                stats["unknown_movie"] += 1
+            if person is None or movie is None:
+                stats["dropped"] += 1
+                continue
+            if row["movie_id"] in person["movies"]:
+                stats["duplicate"] += 1
+            person["movies"].add(row["movie_id"])
+            movie["stars"].add(row["person_id"])
+    return stats
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    flags = {arg for arg in sys.argv[1:] if arg.startswith("--")}
+    args = [arg for arg in sys.argv[1:] if arg not in flags]
+    if len(args) > 1 or flags - {"--bidirectional", "--compact"}:
+        sys.exit("Usage: python degrees.py [directory] "
+                 "[--bidirectional] [--compact]")
+    directory = args[0] if len(args) == 1 else "large"
+    bidirectional = "--bidirectional" in flags
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    stats = load_data(directory, compact="--compact" in flags)
     print("Data loaded.")
+    if stats and stats["dropped"]:
+        print(f"Skipped {stats['dropped']} of {stats['rows']} stars rows "
+              "with unknown ids.")
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,7 +113,11 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if bidirectional:
+        path, num_explored = shortest_path_bidirectional(source, target)
+        print(f"{num_explored} people explored.")
+    else:
+        path = shortest_path(source, target)
 
     if path is None:
         print("Not connected.")
@@ -91,6 +139,15 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
+    if graph is not None:
+        path, _ = graph.shortest_path(source, target, bidirectional=False)
+        if path is None:
+            raise Exception("No Solution")
+        return path
+
+    # A person is zero steps from themselves, as in the compact graph
+    if source == target:
+        return []
 
     # Keep track of number of states explored
     num_explored = 0
@@ -140,15 +197,163 @@ def shortest_path(source, target):
 
                 frontier.add(child)
 
-def person_id_for_name(name):
+
+def shortest_path_bidirectional(source, target):
+    """
+    Returns a tuple (path, num_explored), where path is the shortest
+    list of (movie_id, person_id) pairs that connect the source to the
+    target and num_explored is the number of people expanded.
+
+    Searches breadth-first from both the source and the target, always
+    expanding a full level of the smaller frontier, and stops as soon
+    as the two searches meet.
+
+    If no possible path, path is None.
+    """
+    if graph is not None:
+        return graph.shortest_path(source, target)
+
+    if source == target:
+        return [], 0
+
+    # Map each reached person to the (movie_id, person_id) step leading
+    # back towards the side's starting person
+    source_parents = {source: None}
+    target_parents = {target: None}
+    source_frontier = [source]
+    target_frontier = [target]
+    num_explored = 0
+
+    while source_frontier and target_frontier:
+
+        # Expand the side with fewer people waiting
+        if len(source_frontier) <= len(target_frontier):
+            frontier = source_frontier
+            parents, other = source_parents, target_parents
+        else:
+            frontier = target_frontier
+            parents, other = target_parents, source_parents
+
+        next_frontier = []
+        for person_id in frontier:
+            num_explored += 1
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id in parents:
+                    continue
+                parents[neighbor_id] = (movie_id, person_id)
+
+                # Both searches reached this person, so the path is complete.
+                # Levels are expanded whole, so the first meeting is shortest
+                if neighbor_id in other:
+                    path = join_paths(
+                        source_parents, target_parents, neighbor_id
+                    )
+                    return path, num_explored
+                next_frontier.append(neighbor_id)
+
+        if frontier is source_frontier:
+            source_frontier = next_frontier
+        else:
+            target_frontier = next_frontier
+
+    return None, num_explored
+
+
+def join_paths(source_parents, target_parents, meeting):
+    """
+    Returns the list of (movie_id, person_id) pairs from the source to the
+    target through `meeting`, given the parent maps of both searches.
+    """
+    path = []
+    person_id = meeting
+    while source_parents[person_id] is not None:
+        movie_id, parent_id = source_parents[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
+
+    person_id = meeting
+    while target_parents[person_id] is not None:
+        movie_id, person_id = target_parents[person_id]
+        path.append((movie_id, person_id))
+    return path
+
+
+def shortest_paths(pairs, processes=None):
+    """
+    Yields (source, target, path) tuples for many (source, target) pairs,
+    where path is as returned by `shortest_path` or None if not connected.
+
+    Pairs sharing a source are answered by a single breadth-first search
+    that stops once all of that source's targets are found. Paths are
+    yielded as they complete, not in input order. With the compact graph
+    loaded, `processes` spreads the searches across a pool of that many
+    worker processes; None or 1 searches in this process. A pool needs
+    the compact graph, so asking for one without it is an error.
+    """
+    if graph is not None:
+        yield from compact_graph.shortest_paths(graph, pairs, processes)
+        return
+    if processes is not None and processes != 1:
+        raise Exception("A process pool needs data loaded with compact=True.")
+
+    groups = {}
+    for source, target in pairs:
+        groups.setdefault(source, set()).add(target)
+
+    for source, targets in groups.items():
+        remaining = set(targets)
+        if source in remaining:
+            remaining.remove(source)
+            yield source, source, []
+
+        parents = {source: None}
+        frontier = [source]
+        while frontier and remaining:
+            next_frontier = []
+            for person_id in frontier:
+                for movie_id, neighbor_id in neighbors_for_person(person_id):
+                    if neighbor_id in parents:
+                        continue
+                    parents[neighbor_id] = (movie_id, person_id)
+                    if neighbor_id in remaining:
+                        remaining.remove(neighbor_id)
+                        path = join_paths(parents, {neighbor_id: None},
+                                          neighbor_id)
+                        yield source, neighbor_id, path
+                    next_frontier.append(neighbor_id)
+            frontier = next_frontier
+
+        for target in remaining:
+            yield source, target, None
+
+
+class AmbiguousName(Exception):
+    """
+    Raised when a name matches several people and no one can be asked
+    which was meant. `candidates` lists the matching person ids.
+    """
+
+    def __init__(self, name, candidates):
+        super().__init__(f"'{name}' matches {len(candidates)} people")
+        self.name = name
+        self.candidates = candidates
+
+
+def person_id_for_name(name, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If `interactive` is false, ambiguous names raise AmbiguousName
+    instead of prompting on stdin.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if not interactive:
+            raise AmbiguousName(name, sorted(person_ids))
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
@@ -171,6 +376,13 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        person = graph.person_index(person_id)
+        return {
+            (graph.movie_ids[movie], graph.person_ids[neighbor])
+            for movie, neighbor in graph.neighbors(person)
+        }
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,802 @@
+import csv
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+from array import array
+from collections.abc import Mapping
+
+# Snapshot files start with this magic string, followed by the length of
+# a JSON header describing the format version, the CSV files the snapshot
+# was built from, and where each array lives in the file
+SNAPSHOT_MAGIC = b"DEGRAPH\0"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_NAME = "graph.snapshot"
+CSV_FILES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Number of stars.csv rows read at a time when building a graph
+CHUNK_SIZE = 100000
+
+# Attributes of a Graph holding integer arrays, and those holding strings
+ARRAYS = ["person_offsets", "person_movies", "movie_offsets", "movie_people",
+          "name_people"]
+TABLES = ["person_ids", "person_names", "person_births",
+          "movie_ids", "movie_titles", "movie_years", "name_keys"]
+
+
+class StringTable():
+    """
+    A read-only sequence of strings packed into one buffer of UTF-8 bytes,
+    with `offsets[i]:offsets[i + 1]` delimiting the i-th string.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        """
+        Pack an iterable of strings into a new table.
+        """
+        offsets = array("q", [0])
+        chunks = []
+        end = 0
+        for string in strings:
+            chunk = string.encode("utf-8")
+            chunks.append(chunk)
+            end += len(chunk)
+            offsets.append(end)
+        return cls(b"".join(chunks), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.key(i), "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def key(self, i):
+        """
+        Return the raw bytes of the i-th string.
+        """
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]])
+
+    def bisect_left(self, key):
+        """
+        Return the first index whose bytes are not less than `key`.
+        Table must be sorted.
+        """
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def bisect_right(self, key):
+        """
+        Return the first index whose bytes are greater than `key`.
+        Table must be sorted.
+        """
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key < self.key(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def index(self, string):
+        """
+        Return the index of `string` in a sorted table, or None.
+        """
+        key = string.encode("utf-8")
+        i = self.bisect_left(key)
+        if i < len(self) and self.key(i) == key:
+            return i
+        return None
+
+
+def read_stars(directory, person_index, movie_index, stats, chunk_size):
+    """
+    Stream stars.csv in chunks of at most `chunk_size` rows, yielding
+    parallel arrays (people, movies) of indices for each chunk.
+    Rows naming an unknown person or movie are skipped and counted
+    in `stats`.
+    """
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                return
+            people = array("i")
+            movies = array("i")
+            for row in rows:
+                person = person_index.get(row["person_id"])
+                movie = movie_index.get(row["movie_id"])
+                if person is None:
+                    stats["unknown_person"] += 1
+                if movie is None:
+                    stats["unknown_movie"] += 1
+                if person is None or movie is None:
+                    stats["dropped"] += 1
+                    continue
+                people.append(person)
+                movies.append(movie)
+            stats["rows"] += len(rows)
+            yield people, movies
+
+
+def deduplicate(offsets, indices):
+    """
+    Sort each row of a compressed sparse row adjacency and drop repeated
+    entries, in place. Returns the number of entries removed.
+    """
+    start = write = 0
+    for row in range(len(offsets) - 1):
+        end = offsets[row + 1]
+        values = array("i", sorted(set(indices[start:end])))
+        indices[write:write + len(values)] = values
+        write += len(values)
+        offsets[row + 1] = write
+        start = end
+    removed = len(indices) - write
+    del indices[write:]
+    return removed
+
+
+class Graph():
+    """
+    Bipartite person-movie graph with IMDB ids interned to integers.
+
+    People and movies are numbered by the sorted order of their ids, and
+    the adjacency in both directions is kept in compressed sparse row
+    form: the movies of person `p` are
+    `person_movies[person_offsets[p]:person_offsets[p + 1]]`, and the
+    stars of movie `m` are
+    `movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+
+    `name_keys` holds every person's lowercased name in sorted order,
+    with `name_people` giving the matching person index.
+    """
+
+    # Snapshot the graph was memory-mapped from, if any, and the
+    # fingerprint it was opened with
+    filename = None
+    fingerprint = None
+
+    # Counts of stars rows read and skipped while building the graph
+    stats = None
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 name_keys, name_people):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+        self.name_keys = name_keys
+        self.name_people = name_people
+
+    @classmethod
+    def from_csv(cls, directory, chunk_size=CHUNK_SIZE):
+        """
+        Build a graph from the people, movies and stars CSV files
+        in `directory`.
+
+        stars.csv is streamed twice in chunks of `chunk_size` rows: once
+        to count each person's and movie's entries, then again to fill
+        the adjacency arrays in place, so no edge list is ever held in
+        memory. Rows with unknown ids or repeated rows are skipped, and
+        counted in the graph's `stats`.
+        """
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            people = sorted(
+                (row["id"], row["name"], row["birth"])
+                for row in csv.DictReader(f)
+            )
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            movies = sorted(
+                (row["id"], row["title"], row["year"])
+                for row in csv.DictReader(f)
+            )
+        person_ids = StringTable.from_strings(row[0] for row in people)
+        movie_ids = StringTable.from_strings(row[0] for row in movies)
+
+        # Temporary maps from id to index, only needed while reading stars
+        person_index = {row[0]: i for i, row in enumerate(people)}
+        movie_index = {row[0]: i for i, row in enumerate(movies)}
+        stats = {"rows": 0, "dropped": 0, "unknown_person": 0,
+                 "unknown_movie": 0, "duplicate": 0}
+
+        # First pass counts entries per row, turned into offsets in place
+        person_offsets = array("q", [0]) * (len(people) + 1)
+        movie_offsets = array("q", [0]) * (len(movies) + 1)
+        chunks = read_stars(
+            directory, person_index, movie_index, stats, chunk_size
+        )
+        for chunk_people, chunk_movies in chunks:
+            for person, movie in zip(chunk_people, chunk_movies):
+                person_offsets[person + 1] += 1
+                movie_offsets[movie + 1] += 1
+        for offsets in [person_offsets, movie_offsets]:
+            for i in range(len(offsets) - 1):
+                offsets[i + 1] += offsets[i]
+
+        # Second pass scatters each row into its slot in both directions
+        person_movies = array("i", [0]) * person_offsets[-1]
+        movie_people = array("i", [0]) * movie_offsets[-1]
+        person_cursor = person_offsets[:-1]
+        movie_cursor = movie_offsets[:-1]
+        chunks = read_stars(
+            directory, person_index, movie_index, dict(stats), chunk_size
+        )
+        for chunk_people, chunk_movies in chunks:
+            for person, movie in zip(chunk_people, chunk_movies):
+                person_movies[person_cursor[person]] = movie
+                person_cursor[person] += 1
+                movie_people[movie_cursor[movie]] = person
+                movie_cursor[movie] += 1
+        del person_index, movie_index, person_cursor, movie_cursor
+
+        stats["duplicate"] = deduplicate(person_offsets, person_movies)
+        deduplicate(movie_offsets, movie_people)
+
+        names = sorted((row[1].lower(), i) for i, row in enumerate(people))
+        graph = cls(
+            person_ids,
+            StringTable.from_strings(row[1] for row in people),
+            StringTable.from_strings(row[2] for row in people),
+            movie_ids,
+            StringTable.from_strings(row[1] for row in movies),
+            StringTable.from_strings(row[2] for row in movies),
+            person_offsets, person_movies, movie_offsets, movie_people,
+            StringTable.from_strings(name for name, _ in names),
+            array("i", (i for _, i in names))
+        )
+        graph.stats = stats
+        return graph
+
+    def save(self, filename, fingerprint=None):
+        """
+        Write the graph to a binary snapshot file that `Graph.open` can
+        memory-map. `fingerprint` is stored in the header to identify
+        the data the graph was built from.
+        """
+        sections = []
+        for name in ARRAYS:
+            sections.append((name, getattr(self, name)))
+        for name in TABLES:
+            table = getattr(self, name)
+            sections.append((f"{name}.offsets", table.offsets))
+            sections.append((f"{name}.data", table.data))
+
+        # Lay sections out one after another, each aligned to 8 bytes
+        layout = {}
+        position = 0
+        for name, values in sections:
+            view = memoryview(values)
+            layout[name] = [position, len(view), view.format]
+            position += align(view.nbytes)
+        header = json.dumps({
+            "version": SNAPSHOT_VERSION,
+            "fingerprint": fingerprint,
+            "stats": self.stats,
+            "sections": layout
+        }).encode("utf-8")
+        start = align(len(SNAPSHOT_MAGIC) + 8 + len(header))
+
+        # Write to a temporary file first so readers never see half a file
+        temporary = f"{filename}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            f.write(bytes(start - f.tell()))
+            for name, values in sections:
+                view = memoryview(values)
+                f.write(view)
+                f.write(bytes(align(view.nbytes) - view.nbytes))
+        os.replace(temporary, filename)
+
+    @classmethod
+    def open(cls, filename, fingerprint=None):
+        """
+        Memory-map a snapshot written by `save`. Returns None if the file
+        is missing, truncated or corrupt, has another format version, or
+        was built from data with a different `fingerprint`.
+        """
+        try:
+            f = open(filename, "rb")
+        except FileNotFoundError:
+            return None
+
+        # A truncated or corrupt snapshot is treated like a missing one
+        try:
+            with f:
+                if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                    return None
+                size, = struct.unpack("<Q", f.read(8))
+                header = json.loads(f.read(size))
+                if (header["version"] != SNAPSHOT_VERSION
+                        or header["fingerprint"] != fingerprint):
+                    return None
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            start = align(len(SNAPSHOT_MAGIC) + 8 + size)
+            sections = {}
+            for name, (position, length, format) in (
+                    header["sections"].items()):
+                end = start + position + length * struct.calcsize(format)
+                if end > len(buffer):
+                    return None
+                view = memoryview(buffer)[start + position:end]
+                sections[name] = view.cast("B").cast(format)
+            stats = header.get("stats")
+            arrays = {name: sections[name] for name in ARRAYS}
+            tables = {
+                name: StringTable(sections[f"{name}.data"],
+                                  sections[f"{name}.offsets"])
+                for name in TABLES
+            }
+        except (ValueError, struct.error, TypeError, KeyError):
+            return None
+
+        graph = cls.__new__(cls)
+        graph.filename = filename
+        graph.fingerprint = fingerprint
+        graph.stats = stats
+        for name, values in arrays.items():
+            setattr(graph, name, values)
+        for name, table in tables.items():
+            setattr(graph, name, table)
+        return graph
+
+    def person_index(self, person_id):
+        """
+        Return the integer index of a person's IMDB id.
+        """
+        i = self.person_ids.index(person_id)
+        if i is None:
+            raise KeyError(person_id)
+        return i
+
+    def movie_index(self, movie_id):
+        """
+        Return the integer index of a movie's IMDB id.
+        """
+        i = self.movie_ids.index(movie_id)
+        if i is None:
+            raise KeyError(movie_id)
+        return i
+
+    def movies_of(self, person):
+        """
+        Return the indices of the movies a person starred in.
+        """
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_of(self, movie):
+        """
+        Return the indices of the people who starred in a movie.
+        """
+        return self.movie_people[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+    def people_named(self, name):
+        """
+        Return the indices of all people whose name matches `name`,
+        ignoring case.
+        """
+        key = name.lower().encode("utf-8")
+        lo = self.name_keys.bisect_left(key)
+        hi = self.name_keys.bisect_right(key)
+        return list(self.name_people[lo:hi])
+
+    def neighbors(self, person):
+        """
+        Return (movie, person) index pairs for people
+        who starred with a given person.
+        """
+        return {
+            (movie, neighbor)
+            for movie in self.movies_of(person)
+            for neighbor in self.stars_of(movie)
+        }
+
+    def search(self, source, target):
+        """
+        Breadth-first search between two person indices.
+        Returns a tuple (path, num_explored), where path is a list of
+        (movie, person) index pairs, or None if not connected.
+        """
+        if source == target:
+            return [], 0
+
+        po, pm = self.person_offsets, self.person_movies
+        mo, mp = self.movie_offsets, self.movie_people
+
+        # Map each reached person to the (movie, person) step it came from.
+        # Once a movie has been expanded all its stars have been reached,
+        # so it never needs to be scanned again
+        parents = {source: None}
+        seen_movies = set()
+        frontier = [source]
+        num_explored = 0
+
+        while frontier:
+            next_frontier = []
+            for person in frontier:
+                num_explored += 1
+                for movie in pm[po[person]:po[person + 1]]:
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+                    for neighbor in mp[mo[movie]:mo[movie + 1]]:
+                        if neighbor in parents:
+                            continue
+                        parents[neighbor] = (movie, person)
+                        if neighbor == target:
+                            return trace(parents, target), num_explored
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        return None, num_explored
+
+    def bidirectional_search(self, source, target):
+        """
+        Breadth-first search from both ends between two person indices,
+        expanding a full level of the smaller frontier at a time.
+        Returns a tuple (path, num_explored) like `search`.
+        """
+        if source == target:
+            return [], 0
+
+        po, pm = self.person_offsets, self.person_movies
+        mo, mp = self.movie_offsets, self.movie_people
+
+        sides = [
+            ([source], {source: None}, set()),
+            ([target], {target: None}, set())
+        ]
+        num_explored = 0
+
+        while sides[0][0] and sides[1][0]:
+
+            # Expand the side with fewer people waiting
+            side = 0 if len(sides[0][0]) <= len(sides[1][0]) else 1
+            frontier, parents, seen_movies = sides[side]
+            other = sides[1 - side][1]
+
+            next_frontier = []
+            for person in frontier:
+                num_explored += 1
+                for movie in pm[po[person]:po[person + 1]]:
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+                    for neighbor in mp[mo[movie]:mo[movie + 1]]:
+                        if neighbor in parents:
+                            continue
+                        parents[neighbor] = (movie, person)
+                        if neighbor in other:
+                            path = join(sides[0][1], sides[1][1], neighbor)
+                            return path, num_explored
+                        next_frontier.append(neighbor)
+            sides[side] = (next_frontier, parents, seen_movies)
+
+        return None, num_explored
+
+    def paths_from(self, source, targets):
+        """
+        Breadth-first search from person index `source` that stops as
+        soon as every person index in `targets` has been reached.
+        Yields (target, path) pairs as each target is found, then
+        (target, None) for any targets that are not connected.
+        """
+        remaining = set(targets)
+        if source in remaining:
+            remaining.remove(source)
+            yield source, []
+
+        po, pm = self.person_offsets, self.person_movies
+        mo, mp = self.movie_offsets, self.movie_people
+
+        parents = {source: None}
+        seen_movies = set()
+        frontier = [source]
+
+        while frontier and remaining:
+            next_frontier = []
+            for person in frontier:
+                for movie in pm[po[person]:po[person + 1]]:
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+                    for neighbor in mp[mo[movie]:mo[movie + 1]]:
+                        if neighbor in parents:
+                            continue
+                        parents[neighbor] = (movie, person)
+                        if neighbor in remaining:
+                            remaining.remove(neighbor)
+                            yield neighbor, trace(parents, neighbor)
+                            if not remaining:
+                                return
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        for target in remaining:
+            yield target, None
+
+    def shortest_path(self, source, target, bidirectional=True):
+        """
+        Returns a tuple (path, num_explored), where path is the shortest
+        list of (movie_id, person_id) pairs that connect the source to
+        the target IMDB ids, or None if not connected.
+        """
+        search = self.bidirectional_search if bidirectional else self.search
+        path, num_explored = search(
+            self.person_index(source), self.person_index(target)
+        )
+        if path is not None:
+            path = [
+                (self.movie_ids[movie], self.person_ids[person])
+                for movie, person in path
+            ]
+        return path, num_explored
+
+
+def align(size):
+    """
+    Round `size` up to a multiple of 8 bytes.
+    """
+    return (size + 7) // 8 * 8
+
+
+def fingerprint(directory):
+    """
+    Return the size and modification time of each CSV file in
+    `directory`, used to tell whether a snapshot is stale.
+    """
+    result = []
+    for filename in CSV_FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        result.append([filename, stat.st_size, stat.st_mtime_ns])
+    return result
+
+
+def load(directory, cache=True):
+    """
+    Load the graph for the CSV files in `directory`.
+
+    If `cache` is true, a snapshot is memory-mapped from the directory
+    when it matches the current CSV files, and otherwise the CSV files
+    are parsed and a fresh snapshot is written for next time.
+    """
+    if not cache:
+        return Graph.from_csv(directory)
+
+    filename = os.path.join(directory, SNAPSHOT_NAME)
+    current = fingerprint(directory)
+    graph = Graph.open(filename, current)
+    if graph is None:
+        graph = Graph.from_csv(directory)
+        try:
+            graph.save(filename, current)
+        except OSError:
+            # A read-only data directory just means no cache
+            pass
+    return graph
+
+
+def shortest_paths(graph, pairs, processes=None):
+    """
+    Find shortest paths for many (source, target) pairs of IMDB ids.
+
+    Pairs are grouped by source and each distinct source gets a single
+    breadth-first search, which stops once all of its targets are found.
+    Yields (source, target, path) tuples as paths complete, with path a
+    list of (movie_id, person_id) pairs or None if not connected.
+
+    With `processes` None or 1, sources are searched in this process;
+    otherwise they are searched in a pool of that many worker processes.
+    Workers memory-map the graph's snapshot when it was loaded from one,
+    and otherwise inherit the graph when forked.
+    """
+    groups = {}
+    for source, target in pairs:
+        groups.setdefault(source, set()).add(target)
+    tasks = [
+        (graph.person_index(source), [graph.person_index(t) for t in targets])
+        for source, targets in groups.items()
+    ]
+
+    if processes is None or processes == 1:
+        for source, targets in tasks:
+            yield from search_group(graph, source, targets)
+        return
+
+    with worker_pool(graph, processes) as pool:
+        for results in pool.imap_unordered(search_group_worker, tasks):
+            yield from results
+
+
+def search_group(graph, source, targets):
+    """
+    Yield (source_id, target_id, path) for one source's targets.
+    """
+    source_id = graph.person_ids[source]
+    for target, path in graph.paths_from(source, targets):
+        if path is not None:
+            path = [
+                (graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in path
+            ]
+        yield source_id, graph.person_ids[target], path
+
+
+# Graph used by the current worker process of a `worker_pool`
+worker_graph = None
+
+
+def worker_pool(graph, processes=None):
+    """
+    Return a process pool whose workers see `graph` as `worker_graph`.
+    Workers memory-map the graph's snapshot when it was loaded from one,
+    and otherwise inherit the graph when forked.
+    """
+    if graph.filename is not None:
+        context = multiprocessing.get_context()
+        initargs = (None, graph.filename, graph.fingerprint)
+    else:
+        context = multiprocessing.get_context("fork")
+        initargs = (graph, None, None)
+    return context.Pool(processes, init_worker, initargs)
+
+
+def init_worker(graph, filename, fingerprint):
+    """
+    Set up a pool worker with either a graph or a snapshot to open.
+    """
+    global worker_graph
+    if filename is not None:
+        graph = Graph.open(filename, fingerprint)
+        if graph is None:
+            raise Exception("snapshot changed while searching")
+    worker_graph = graph
+
+
+def search_group_worker(task):
+    """
+    Search one (source, targets) group in a pool worker.
+    """
+    source, targets = task
+    return list(search_group(worker_graph, source, targets))
+
+
+def trace(parents, person):
+    """
+    Follow `parents` back from `person` to the start of the search,
+    returning the (movie, person) steps in forward order.
+    """
+    path = []
+    while parents[person] is not None:
+        movie, parent = parents[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+    return path
+
+
+def join(source_parents, target_parents, meeting):
+    """
+    Returns the (movie, person) steps from the source to the target
+    through `meeting`, given the parent maps of both searches.
+    """
+    path = trace(source_parents, meeting)
+    person = meeting
+    while target_parents[person] is not None:
+        movie, person = target_parents[person]
+        path.append((movie, person))
+    return path
+
+
+class PeopleView(Mapping):
+    """
+    Read-only view of a graph shaped like the `people` dict in degrees.py.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index(person_id)
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[m] for m in graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+    def __contains__(self, person_id):
+        return self.graph.person_ids.index(person_id) is not None
+
+
+class MoviesView(Mapping):
+    """
+    Read-only view of a graph shaped like the `movies` dict in degrees.py.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index(movie_id)
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[p] for p in graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+    def __contains__(self, movie_id):
+        return self.graph.movie_ids.index(movie_id) is not None
+
+
+class NamesView(Mapping):
+    """
+    Read-only view of a graph shaped like the `names` dict in degrees.py.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        if name != name.lower():
+            raise KeyError(name)
+        people = self.graph.people_named(name)
+        if not people:
+            raise KeyError(name)
+        return {self.graph.person_ids[p] for p in people}
+
+    def __iter__(self):
+        previous = None
+        for name in self.graph.name_keys:
+            if name != previous:
+                yield name
+            previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
@@ -0,0 +1,273 @@
+import heapq
+import json
+import struct
+import sys
+from array import array
+
+import degrees
+import graph as compact_graph
+
+# Distance stored for people a landmark cannot reach. Anyone further than
+# 254 steps from a landmark is treated as unreachable too
+UNREACHABLE = 255
+
+INDEX_MAGIC = b"DEGMARK\0"
+INDEX_NAME = "landmarks.index"
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few well-connected landmark people to
+    everyone else, used to bound degrees of separation without searching.
+
+    People are numbered by the sorted order of their IMDB ids, the same
+    numbering as `graph.Graph`, and `distances[i][p]` is the number of
+    steps from landmark `landmarks[i]` to person `p`.
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.positions = positions()
+
+    @classmethod
+    def build(cls, k=16):
+        """
+        Pick the `k` people who starred in the most movies as landmarks
+        and compute their distances to everyone else.
+        Data must already be loaded with `degrees.load_data`.
+        """
+        if degrees.graph is not None:
+            graph = degrees.graph
+            offsets = graph.person_offsets
+            candidates = range(len(graph.person_ids))
+            movie_counts = [offsets[p + 1] - offsets[p] for p in candidates]
+            person_ids = graph.person_ids
+        else:
+            person_ids = sorted(degrees.people)
+            movie_counts = [
+                len(degrees.people[person_id]["movies"])
+                for person_id in person_ids
+            ]
+        chosen = sorted(range(len(person_ids)),
+                        key=lambda p: movie_counts[p], reverse=True)[:k]
+        landmarks = [person_ids[p] for p in chosen]
+        return cls(landmarks, [distances_from(p) for p in landmarks])
+
+    def save(self, filename, fingerprint=None):
+        """
+        Write the index to a binary file. `fingerprint` is stored in the
+        header to identify the data the index was built from.
+        """
+        header = json.dumps({
+            "landmarks": self.landmarks,
+            "size": len(self.distances[0]) if self.distances else 0,
+            "fingerprint": fingerprint
+        }).encode("utf-8")
+        with open(filename, "wb") as f:
+            f.write(INDEX_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for distances in self.distances:
+                f.write(distances)
+
+    @classmethod
+    def load(cls, filename, fingerprint=None):
+        """
+        Read an index written by `save`. The data it was built from must
+        already be loaded with `degrees.load_data`, and `fingerprint`
+        must match the one it was saved with.
+        """
+        with open(filename, "rb") as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise Exception(f"{filename} is not a landmark index")
+            size, = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(size))
+            distances = []
+            for _ in header["landmarks"]:
+                row = array("B")
+                row.frombytes(f.read(header["size"]))
+                distances.append(row)
+        if (header["size"] != len(degrees.people)
+                or header.get("fingerprint") != fingerprint):
+            raise Exception("landmark index was built from other data")
+        return cls(header["landmarks"], distances)
+
+    def bounds(self, source, target):
+        """
+        Return (lower, upper) bounds on the degrees of separation between
+        two person ids. `upper` is None if no landmark reaches both, and
+        both are None if the two people are known not to be connected.
+        """
+        if source == target:
+            return 0, 0
+        s = self.positions(source)
+        t = self.positions(target)
+        lower, upper = 1, None
+        for distances in self.distances:
+            ds, dt = distances[s], distances[t]
+            if ds == UNREACHABLE and dt == UNREACHABLE:
+                continue
+            if ds == UNREACHABLE or dt == UNREACHABLE:
+                return None, None
+            lower = max(lower, abs(ds - dt))
+            if upper is None or ds + dt < upper:
+                upper = ds + dt
+        return lower, upper
+
+    def separation(self, source, target):
+        """
+        Return the degrees of separation between two person ids, or None
+        if not connected. Searches only when the bounds do not agree.
+        """
+        lower, upper = self.bounds(source, target)
+        if lower is None:
+            return None
+        if lower == upper:
+            return lower
+        path, _ = self.shortest_path(source, target)
+        return None if path is None else len(path)
+
+    def shortest_path(self, source, target):
+        """
+        A* search guided by landmark lower bounds.
+        Returns a tuple (path, num_explored), where path is the shortest
+        list of (movie_id, person_id) pairs that connect the source to
+        the target, or None if not connected.
+        """
+        if source == target:
+            return [], 0
+        lower, _ = self.bounds(source, target)
+        if lower is None:
+            return None, 0
+
+        t = self.positions(target)
+        targets = [
+            (distances, distances[t]) for distances in self.distances
+            if distances[t] != UNREACHABLE
+        ]
+
+        def heuristic(person_id):
+            p = self.positions(person_id)
+            estimate = 0
+            for distances, dt in targets:
+                dp = distances[p]
+                if dp != UNREACHABLE and abs(dp - dt) > estimate:
+                    estimate = abs(dp - dt)
+            return estimate
+
+        # Frontier entries are (cost + estimate, tie breaker, cost, person)
+        parents = {source: None}
+        costs = {source: 0}
+        frontier = [(heuristic(source), 0, 0, source)]
+        counter = 0
+        num_explored = 0
+
+        while frontier:
+            _, _, cost, person_id = heapq.heappop(frontier)
+            if cost > costs[person_id]:
+                continue
+            if person_id == target:
+                path = degrees.join_paths(parents, {target: None}, target)
+                return path, num_explored
+            num_explored += 1
+
+            neighbors = degrees.neighbors_for_person(person_id)
+            for movie_id, neighbor_id in neighbors:
+                if neighbor_id in costs and costs[neighbor_id] <= cost + 1:
+                    continue
+                costs[neighbor_id] = cost + 1
+                parents[neighbor_id] = (movie_id, person_id)
+                counter += 1
+                heapq.heappush(frontier, (
+                    cost + 1 + heuristic(neighbor_id),
+                    counter, cost + 1, neighbor_id
+                ))
+
+        return None, num_explored
+
+
+def positions():
+    """
+    Return a function mapping person ids to their position in sorted
+    order, using the loaded compact graph if there is one.
+    """
+    if degrees.graph is not None:
+        return degrees.graph.person_index
+    return {
+        person_id: i for i, person_id in enumerate(sorted(degrees.people))
+    }.__getitem__
+
+
+def distances_from(source):
+    """
+    Return an array of breadth-first distances from the person id `source`
+    to every person, indexed by position in sorted id order.
+    """
+    graph = degrees.graph
+    if graph is not None:
+        return graph_distances(graph, graph.person_index(source))
+
+    position = positions()
+    distances = array("B", [UNREACHABLE]) * len(degrees.people)
+    distances[position(source)] = 0
+    frontier = [source]
+    depth = 0
+    while frontier and depth < UNREACHABLE - 1:
+        depth += 1
+        next_frontier = []
+        for person_id in frontier:
+            for _, neighbor_id in degrees.neighbors_for_person(person_id):
+                p = position(neighbor_id)
+                if distances[p] == UNREACHABLE:
+                    distances[p] = depth
+                    next_frontier.append(neighbor_id)
+        frontier = next_frontier
+    return distances
+
+
+def graph_distances(graph, source):
+    """
+    Return an array of breadth-first distances in the compact `graph`
+    from person index `source` to every person index.
+    """
+    distances = array("B", [UNREACHABLE]) * len(graph.person_ids)
+    po, pm = graph.person_offsets, graph.person_movies
+    mo, mp = graph.movie_offsets, graph.movie_people
+    seen_movies = bytearray(len(graph.movie_ids))
+    frontier = [source]
+    distances[source] = 0
+    depth = 0
+    while frontier and depth < UNREACHABLE - 1:
+        depth += 1
+        next_frontier = []
+        for person in frontier:
+            for movie in pm[po[person]:po[person + 1]]:
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for neighbor in mp[mo[movie]:mo[movie + 1]]:
+                    if distances[neighbor] == UNREACHABLE:
+                        distances[neighbor] = depth
+                        next_frontier.append(neighbor)
+        frontier = next_frontier
+    return distances
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python landmarks.py directory [k]")
+    directory = sys.argv[1]
+    k = int(sys.argv[2]) if len(sys.argv) == 3 else 16
+
+    print("Loading data...")
+    degrees.load_data(directory, compact=True)
+    print(f"Building index with {k} landmarks...")
+    index = LandmarkIndex.build(k)
+    index.save(f"{directory}/{INDEX_NAME}",
+               compact_graph.fingerprint(directory))
+    print(f"Index written to {directory}/{INDEX_NAME}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+from array import array
+
+import degrees
+from graph import StringTable
+
+
+class NameIndex():
+    """
+    Prefix and typo-tolerant lookup of people by name.
+
+    Lowercased names are kept sorted, so every name with a given prefix
+    lies in one range found by binary search. For misspelled names, a
+    trigram index over the distinct names narrows the search to names
+    sharing enough trigrams with the query, which are then checked by
+    edit distance.
+    """
+
+    def __init__(self):
+        """
+        Build the index for the data loaded with `degrees.load_data`.
+        """
+        graph = degrees.graph
+        if graph is not None:
+            self.keys = graph.name_keys
+            self.people = PersonIds(graph)
+        else:
+            pairs = sorted(
+                (name, person_id)
+                for name, person_ids in degrees.names.items()
+                for person_id in person_ids
+            )
+            self.keys = StringTable.from_strings(name for name, _ in pairs)
+            self.people = [person_id for _, person_id in pairs]
+
+        # Position of the first entry of each distinct name, and the
+        # distinct names containing each trigram, in ascending order
+        self.starts = array("i")
+        self.trigrams = {}
+        previous = None
+        for i, name in enumerate(self.keys):
+            if name == previous:
+                continue
+            previous = name
+            for trigram in trigrams(name):
+                postings = self.trigrams.get(trigram)
+                if postings is None:
+                    postings = self.trigrams[trigram] = array("i")
+                postings.append(len(self.starts))
+            self.starts.append(i)
+
+    def complete(self, prefix, limit=10):
+        """
+        Return up to `limit` people whose name starts with `prefix`,
+        ignoring case, in alphabetical order with the people who starred
+        in the most movies first among those sharing a name.
+        """
+        key = prefix.lower().encode("utf-8")
+        lo = self.keys.bisect_left(key)
+
+        # UTF-8 never contains byte 0xff, so it sorts after every extension
+        hi = self.keys.bisect_left(key + b"\xff")
+        results = []
+        i = lo
+        while i < hi and len(results) < limit:
+            j = self.keys.bisect_right(self.keys.key(i))
+            results.extend(
+                rank_people([self.people[k] for k in range(i, j)])
+            )
+            i = j
+        return results[:limit]
+
+    def lookup(self, name, limit=10, max_distance=None):
+        """
+        Return up to `limit` people whose name is within `max_distance`
+        edits of `name`, ignoring case, closest first. Each result has
+        the person's id, name, birth year and edit distance.
+
+        By default, longer names tolerate more typos: none below 4
+        characters, one below 8, and two otherwise.
+        """
+        query = name.lower()
+        if max_distance is None:
+            if len(query) < 4:
+                max_distance = 0
+            elif len(query) < 8:
+                max_distance = 1
+            else:
+                max_distance = 2
+
+        # Each edit changes at most three trigrams, so a match must share
+        # `need` of the query's trigrams and so must appear in at least one
+        # of the rarest len(grams) - need + 1 posting lists
+        grams = sorted(
+            trigrams(query),
+            key=lambda g: len(self.trigrams.get(g, ()))
+        )
+        need = max(1, len(grams) - 3 * max_distance)
+        candidates = set()
+        for gram in grams[:len(grams) - need + 1]:
+            candidates.update(self.trigrams.get(gram, ()))
+
+        matches = []
+        for candidate in candidates:
+            start = self.starts[candidate]
+            distance = edit_distance(query, self.keys[start], max_distance)
+            if distance is not None:
+                matches.append((distance, self.keys[start], start))
+        matches.sort()
+
+        results = []
+        for distance, key, start in matches:
+            end = self.keys.bisect_right(self.keys.key(start))
+            for person in rank_people(
+                [self.people[k] for k in range(start, end)]
+            ):
+                person["distance"] = distance
+                results.append(person)
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+
+class PersonIds():
+    """
+    Sequence of person ids in name order for a compact graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, i):
+        return self.graph.person_ids[self.graph.name_people[i]]
+
+    def __len__(self):
+        return len(self.graph.name_people)
+
+
+def rank_people(person_ids):
+    """
+    Describe people sharing a name, most movies first.
+    """
+    results = []
+    for person_id in person_ids:
+        person = degrees.people[person_id]
+        results.append({
+            "id": person_id,
+            "name": person["name"],
+            "birth": person["birth"],
+            "movies": len(person["movies"])
+        })
+    results.sort(key=lambda person: (-person["movies"], person["id"]))
+    return results
+
+
+def trigrams(name):
+    """
+    Return the set of three-character substrings of a name, padded so
+    that its start and end form trigrams of their own.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Return the Levenshtein distance between two strings,
+    or None if it is more than `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
@@ -0,0 +1,286 @@
+import json
+import os
+import socketserver
+import stat
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import degrees
+from nameindex import NameIndex
+
+
+class Metrics():
+    """
+    Running totals of requests served, shared by all handler threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_explored = 0
+
+    def record(self, latency, num_explored, error):
+        with self.lock:
+            self.requests += 1
+            self.errors += error
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_explored += num_explored
+
+    def summary(self):
+        with self.lock:
+            count = max(self.requests, 1)
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "mean_latency_ms": 1000 * self.total_latency / count,
+                "max_latency_ms": 1000 * self.max_latency,
+                "mean_explored": self.total_explored / count
+            }
+
+
+metrics = Metrics()
+
+# Most names an autocomplete or lookup request may ask for
+MAX_LIMIT = 100
+
+# Name index for autocomplete and fuzzy lookup, built when serving starts
+name_index = None
+
+
+class RequestError(Exception):
+    """
+    A request that cannot be answered, with the HTTP status to send.
+    """
+
+    def __init__(self, status, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details or {}
+
+
+def describe(person_id):
+    """
+    Return a JSON-ready description of a person.
+    """
+    person = degrees.people[person_id]
+    return {"id": person_id, "name": person["name"], "birth": person["birth"]}
+
+
+def resolve(request, field):
+    """
+    Return the person id for `field` in a request, which may give either
+    a person's id under "<field>_id" or their name under `field`.
+    Raises RequestError if the person cannot be identified.
+    """
+    person_id = request.get(f"{field}_id")
+    if person_id is not None:
+        if not isinstance(person_id, str):
+            raise RequestError(400, f"{field}_id must be a string.")
+        if person_id not in degrees.people:
+            raise RequestError(404, f"Unknown {field} id.")
+        return person_id
+
+    name = request.get(field)
+    if not isinstance(name, str):
+        raise RequestError(400, f"Missing {field}.")
+    try:
+        person_id = degrees.person_id_for_name(name, interactive=False)
+    except degrees.AmbiguousName as e:
+        raise RequestError(300, f"Ambiguous {field}.", {
+            "field": field,
+            "candidates": [describe(p) for p in e.candidates]
+        })
+    if person_id is None:
+        raise RequestError(404, f"No person named '{name}'.")
+    return person_id
+
+
+def find_path(request):
+    """
+    Answer a path request, returning (response, num_explored).
+    """
+    source = resolve(request, "source")
+    target = resolve(request, "target")
+    path, num_explored = degrees.shortest_path_bidirectional(source, target)
+    if path is None:
+        response = {"connected": False, "degrees": None, "path": None}
+        return response, num_explored
+
+    steps = []
+    previous = source
+    for movie_id, person_id in path:
+        movie = degrees.movies[movie_id]
+        steps.append({
+            "from": describe(previous),
+            "to": describe(person_id),
+            "movie": {"id": movie_id, "title": movie["title"],
+                      "year": movie["year"]}
+        })
+        previous = person_id
+    response = {
+        "connected": True,
+        "degrees": len(path),
+        "source": describe(source),
+        "target": describe(target),
+        "path": steps
+    }
+    return response, num_explored
+
+
+def limit_of(request):
+    """
+    Return the number of names a request asks for, 10 by default and at
+    most MAX_LIMIT. Raises RequestError unless it is a positive integer.
+    """
+    limit = request.get("limit", 10)
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise RequestError(400, "limit must be a positive integer.")
+    return min(limit, MAX_LIMIT)
+
+
+def complete_names(request):
+    """
+    Answer an autocomplete request, returning (response, num_explored).
+    """
+    prefix = request.get("prefix")
+    if not isinstance(prefix, str):
+        raise RequestError(400, "Missing prefix.")
+    return {"candidates": name_index.complete(prefix, limit_of(request))}, 0
+
+
+def lookup_names(request):
+    """
+    Answer a typo-tolerant name lookup, returning (response, num_explored).
+    """
+    name = request.get("name")
+    if not isinstance(name, str):
+        raise RequestError(400, "Missing name.")
+    return {"candidates": name_index.lookup(name, limit_of(request))}, 0
+
+
+# Functions answering each POST endpoint
+ROUTES = {
+    "/path": find_path,
+    "/complete": complete_names,
+    "/lookup": lookup_names
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    JSON API:
+        POST /path      {"source": name, "target": name} or
+                        {"source_id": id, "target_id": id}
+        POST /complete  {"prefix": text, "limit": n}
+        POST /lookup    {"name": text, "limit": n}
+        GET  /metrics   request counts, latency and people explored
+    """
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self.reply(200, metrics.summary())
+        else:
+            self.reply(404, {"error": "Not found."})
+
+    def do_POST(self):
+        route = ROUTES.get(self.path)
+        if route is None:
+            self.reply(404, {"error": "Not found."})
+            return
+
+        start = time.perf_counter()
+        num_explored = 0
+        try:
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                raise RequestError(400, "Invalid Content-Length.")
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                raise RequestError(400, "Request body must be JSON.")
+            if not isinstance(request, dict):
+                raise RequestError(400, "Request body must be an object.")
+            response, num_explored = route(request)
+            status = 200
+        except RequestError as e:
+            status = e.status
+            response = {"error": str(e), **e.details}
+        except Exception as e:
+            # Answer and count the request even when handling it fails
+            traceback.print_exc()
+            status = 500
+            response = {"error": f"Internal error: {type(e).__name__}."}
+
+        latency = time.perf_counter() - start
+        metrics.record(latency, num_explored, status != 200)
+        response["num_explored"] = num_explored
+        response["latency_ms"] = 1000 * latency
+        self.reply(status, response)
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "local"
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    """
+    HTTP server listening on a Unix socket, one thread per request.
+    """
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def main():
+    global name_index
+    args = sys.argv[1:]
+    if len(args) != 3 or args[1] not in ["--port", "--socket"]:
+        sys.exit("Usage: python server.py directory "
+                 "(--port number | --socket path)")
+    directory, mode, address = args
+
+    print("Loading data...")
+    degrees.load_data(directory, compact=True)
+    name_index = NameIndex()
+    print("Data loaded.")
+
+    if mode == "--port":
+        server = ThreadingHTTPServer(("127.0.0.1", int(address)), Handler)
+    else:
+        # Replace a stale socket left behind by an earlier server
+        if os.path.exists(address):
+            if stat.S_ISSOCK(os.stat(address).st_mode):
+                os.remove(address)
+        server = ThreadingUnixHTTPServer(address, Handler)
+    print(f"Serving on {address}.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
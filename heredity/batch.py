@@ -0,0 +1,168 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+
+import elimination
+import sampling
+import vectorized
+from heredity import PROBS, load_data
+
+METHODS = ["elimination", "vectorized", "gibbs"]
+FORMATS = ["jsonl", "csv"]
+
+# Columns of each output record, one record per person
+FIELDS = ["family", "person", "gene_2", "gene_1", "gene_0", "trait",
+          "error"]
+
+# Families handed to a worker at a time
+CHUNK_SIZE = 16
+
+
+def family_files(source):
+    """
+    Return the family CSV files to run, from either a directory (every
+    .csv file in it, sorted by name) or a manifest file listing one path
+    per line. Manifest paths are relative to the manifest's directory,
+    and blank lines and lines starting with # are skipped.
+    """
+    if os.path.isdir(source):
+        return [
+            os.path.join(source, filename)
+            for filename in sorted(os.listdir(source))
+            if filename.endswith(".csv")
+        ]
+    directory = os.path.dirname(source)
+    files = []
+    with open(source) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                files.append(os.path.join(directory, line))
+    return files
+
+
+def probabilities(people, method):
+    """
+    Return gene and trait distributions for one family by `method`, in
+    the form computed by `heredity.main`.
+    """
+    if method == "elimination":
+        return elimination.probabilities(people)
+    if method == "vectorized":
+        return vectorized.probabilities(people)
+    if method == "gibbs":
+        return sampling.estimate(people).probabilities()
+    raise Exception(f"Unknown method {method}.")
+
+
+# Method of the current worker process in `run`
+worker_method = None
+
+
+def init_worker(method):
+    global worker_method
+    worker_method = method
+
+    # Build the tables every family shares once per worker
+    elimination.inheritance_table(PROBS["mutation"])
+    for observed in [None, False, True]:
+        elimination.trait_table(observed)
+
+
+def infer_file(filename):
+    """
+    Run inference for one family file in a pool worker, returning
+    (filename, probabilities, error). A family that cannot be loaded or
+    solved gives an error message instead of stopping the batch.
+    """
+    try:
+        people = load_data(filename)
+        return filename, probabilities(people, worker_method), None
+    except Exception as e:
+        return filename, None, f"{type(e).__name__}: {e}"
+
+
+def records(filename, result, error):
+    """
+    Yield the output records for one family: one per person, or a single
+    record holding the error.
+    """
+    if error is not None:
+        record = dict.fromkeys(FIELDS)
+        record.update(family=filename, error=error)
+        yield record
+        return
+    for person, distributions in result.items():
+        yield {
+            "family": filename,
+            "person": person,
+            "gene_2": distributions["gene"][2],
+            "gene_1": distributions["gene"][1],
+            "gene_0": distributions["gene"][0],
+            "trait": distributions["trait"][True],
+            "error": None
+        }
+
+
+def run(files, method="elimination", processes=None,
+        chunk_size=CHUNK_SIZE):
+    """
+    Yield (filename, probabilities, error) for each of `files` in order,
+    as soon as each is done, running them in a pool of `processes` worker
+    processes (by default one per CPU), or in this process if that is 1.
+    """
+    if method not in METHODS:
+        raise Exception(f"Unknown method {method}.")
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1:
+        init_worker(method)
+        yield from map(infer_file, files)
+        return
+    with multiprocessing.Pool(processes, init_worker, (method,)) as pool:
+        yield from pool.imap(infer_file, files, chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute gene and trait probabilities for many families."
+    )
+    parser.add_argument("source",
+                        help="directory of family CSV files, or a manifest "
+                             "listing one file per line")
+    parser.add_argument("--method", choices=METHODS, default="elimination")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--output", help="file to write results to "
+                                         "instead of standard output")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    files = family_files(args.source)
+    output = sys.stdout if args.output is None else open(
+        args.output, "w", newline=""
+    )
+    failures = 0
+    try:
+        if args.format == "csv":
+            writer = csv.DictWriter(output, FIELDS)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            write = lambda record: output.write(json.dumps(record) + "\n")
+        for filename, result, error in run(files, args.method,
+                                           args.processes, args.chunk_size):
+            failures += error is not None
+            for record in records(filename, result, error):
+                write(record)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Ran {len(files)} families, {failures} failed.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import functools
+import heapq
+import sys
+
+import numpy as np
+
+import heredity
+from heredity import PROBS, load_data, print_probabilities
+
+# Gene copy counts, in the order of each factor's axes
+COPIES = [0, 1, 2]
+
+# Most people a single factor may mention, as a factor over 16 people
+# already has 3^16 (about 43 million) entries
+MAX_WIDTH = 16
+
+
+class Factor():
+    """
+    A nonnegative function of some people's gene copy counts, stored as
+    an array with one axis of length 3 per person in `variables`.
+    """
+
+    def __init__(self, variables, values):
+        self.variables = tuple(variables)
+        self.values = values
+
+
+@functools.lru_cache
+def inheritance_table(mutation):
+    """
+    Return `heredity.inheritance_table` as a 3 x 3 x 3 array giving the
+    probability that a child has each number of copies of the gene,
+    indexed by (mother, father, child) copy counts.
+
+    Tables are cached by mutation rate and shared between callers, so
+    they are read-only.
+    """
+    table = np.array(heredity.inheritance_table(mutation))
+    table.setflags(write=False)
+    return table
+
+
+@functools.lru_cache
+def trait_table(observed):
+    """
+    Return the probability of an observed trait for each gene copy
+    count, or ones if the trait was not observed. Cached and read-only,
+    like `inheritance_table`.
+    """
+    if observed is None:
+        table = np.ones(3)
+    else:
+        table = np.array([
+            PROBS["trait"][copies][observed] for copies in COPIES
+        ])
+    table.setflags(write=False)
+    return table
+
+
+def family_factors(people):
+    """
+    Return the factors of the joint distribution of everyone's gene
+    copy counts given the observed traits: one per person for their
+    genes given their parents' genes and their trait given their genes.
+    """
+    inheritance = inheritance_table(PROBS["mutation"])
+    prior = np.array([PROBS["gene"][copies] for copies in COPIES])
+    factors = []
+    for person, data in people.items():
+        evidence = trait_table(data["trait"])
+        if data["mother"] is None:
+            factors.append(Factor([person], prior * evidence))
+        else:
+            factors.append(Factor(
+                [data["mother"], data["father"], person],
+                inheritance * evidence
+            ))
+    return factors
+
+
+def combine(factors, keep):
+    """
+    Multiply factors together and sum out every variable not in `keep`,
+    returning a factor over `keep` scaled to sum to 1.
+    """
+    labels = {}
+    operands = []
+    for factor in factors:
+        operands.append(factor.values)
+        operands.append([
+            labels.setdefault(variable, len(labels))
+            for variable in factor.variables
+        ])
+
+    # A variable no factor mentions is unconstrained by them
+    for variable in keep:
+        if variable not in labels:
+            operands.append(np.ones(3))
+            operands.append([labels.setdefault(variable, len(labels))])
+    output = [labels[variable] for variable in keep]
+    values = np.einsum(*operands, output, optimize=len(factors) > 2)
+
+    # Only proportions matter, and rescaling keeps products of many
+    # small probabilities from underflowing
+    total = values.sum()
+    if total == 0:
+        raise Exception("Observed traits are impossible in this family.")
+    return Factor(keep, values / total)
+
+
+def elimination_order(factors):
+    """
+    Return an order in which to eliminate every variable, choosing each
+    time the variable whose elimination adds the fewest new edges
+    between its neighbours (min-fill), breaking ties by fewest
+    neighbours.
+    """
+    neighbours = {}
+    for factor in factors:
+        for variable in factor.variables:
+            neighbours.setdefault(variable, set()).update(factor.variables)
+    for variable in neighbours:
+        neighbours[variable].discard(variable)
+
+    def fill(variable):
+        adjacent = list(neighbours[variable])
+        missing = sum(
+            1 for i, a in enumerate(adjacent) for b in adjacent[i + 1:]
+            if b not in neighbours[a]
+        )
+        return missing, len(adjacent)
+
+    # Candidates by (fill, neighbours), skipping entries that are stale
+    # because the variable's neighbourhood changed since they were pushed
+    scores = {variable: fill(variable) for variable in neighbours}
+    heap = [(score, i, variable)
+            for i, (variable, score) in enumerate(scores.items())]
+    heapq.heapify(heap)
+    counter = len(heap)
+
+    order = []
+    while heap:
+        score, _, variable = heapq.heappop(heap)
+        if variable not in neighbours or scores[variable] != score:
+            continue
+        adjacent = neighbours.pop(variable)
+        for a in adjacent:
+            neighbours[a].discard(variable)
+            neighbours[a].update(adjacent - {a})
+        order.append(variable)
+
+        # Only variables near the eliminated one can change their score
+        changed = set(adjacent)
+        for a in adjacent:
+            changed.update(neighbours[a])
+        for c in changed:
+            score = fill(c)
+            if score != scores[c]:
+                scores[c] = score
+                heapq.heappush(heap, (score, counter, c))
+                counter += 1
+    return order
+
+
+def gene_marginals(people):
+    """
+    Return each person's distribution over gene copy counts given the
+    observed traits, as a dictionary of arrays indexed by copy count.
+
+    Factors are placed in a bucket tree along a min-fill elimination
+    order. One pass up the tree eliminates variables as in variable
+    elimination, and one pass down sends every bucket the product of
+    the rest of the tree, so all marginals cost about two eliminations.
+    """
+    factors = family_factors(people)
+    order = elimination_order(factors)
+    position = {variable: i for i, variable in enumerate(order)}
+
+    # Each factor goes in the bucket of its first eliminated variable
+    buckets = [[] for _ in order]
+    for factor in factors:
+        first = min(position[variable] for variable in factor.variables)
+        buckets[first].append(factor)
+
+    # Upward pass: bucket i sums out its variable and sends the result
+    # to the bucket of the first remaining variable it mentions
+    upward = []
+    children = [[] for _ in order]
+    for i, variable in enumerate(order):
+        incoming = buckets[i] + [upward[c] for c in children[i]]
+        scope = set()
+        for factor in incoming:
+            scope.update(factor.variables)
+        if len(scope) > MAX_WIDTH:
+            raise Exception(
+                "Family is too interconnected for exact inference."
+            )
+        rest = sorted(scope, key=position.get)[1:]
+        upward.append(combine(incoming, rest))
+        if rest:
+            children[position[rest[0]]].append(i)
+
+    # Downward pass, from the last bucket eliminated back to the first
+    downward = [None] * len(order)
+    marginals = {}
+    for i in reversed(range(len(order))):
+        incoming = buckets[i] + [upward[c] for c in children[i]]
+        if downward[i] is not None:
+            incoming.append(downward[i])
+        marginals[order[i]] = combine(incoming, [order[i]]).values
+        for c in children[i]:
+            others = [
+                factor for factor in incoming if factor is not upward[c]
+            ]
+            downward[c] = combine(others, upward[c].variables)
+    return marginals
+
+
+def probabilities(people):
+    """
+    Return gene and trait distributions for everyone in `people`, as
+    loaded by `load_data`, in the form computed by `heredity.main`.
+    """
+    genes = gene_marginals(people)
+    result = {}
+    for person, data in people.items():
+        gene = genes[person]
+        if data["trait"] is None:
+            trait = sum(
+                gene[copies] * PROBS["trait"][copies][True]
+                for copies in COPIES
+            )
+        else:
+            trait = float(data["trait"])
+        result[person] = {
+            "gene": {copies: float(gene[copies]) for copies in [2, 1, 0]},
+            "trait": {True: float(trait), False: float(1 - trait)}
+        }
+    return result
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python elimination.py data.csv")
+    people = load_data(sys.argv[1])
+    print_probabilities(people, probabilities(people))
+
+
+if __name__ == "__main__":
+    main()
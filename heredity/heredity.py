@@ -1,5 +1,7 @@
 import csv
+import functools
 import itertools
+import math
 import sys
 
 PROBS = {
@@ -60,31 +62,60 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+    # Joint probabilities are added relative to the largest one seen so
+    # far, so that in a large family they do not all underflow to 0
+    kernel = JointKernel(people)
+    gene_totals = [[0.0] * 3 for _ in kernel.names]
+    trait_totals = [[0.0] * 2 for _ in kernel.names]
+    scale = -math.inf
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
+    # Loop over all sets of people who might have the trait, given
+    # the traits we know
+    for have_trait in trait_assignments(people):
+        traits = kernel.traits(have_trait)
+        total = 0.0
+
+        # Loop over all ways of giving each person 0, 1 or 2 genes
+        for copies in itertools.product(range(3), repeat=len(people)):
+            score = kernel.log_joint(copies, traits)
+            if score == -math.inf:
+                continue
+            if score > scale:
+                factor = math.exp(scale - score)
+                for totals in gene_totals + trait_totals:
+                    for value in range(len(totals)):
+                        totals[value] *= factor
+                total *= factor
+                scale = score
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+            # Add the joint probability to each person's copy count
+            p = math.exp(score - scale)
+            total += p
+            for person_totals, count in zip(gene_totals, copies):
+                person_totals[count] += p
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+        # Everyone has the same trait in every one of these assignments
+        for person_totals, value in zip(trait_totals, traits):
+            person_totals[value] += total
+
+    for person, genes, traits in zip(kernel.names, gene_totals,
+                                     trait_totals):
+        for copies in probabilities[person]["gene"]:
+            probabilities[person]["gene"][copies] = genes[copies]
+        for value in probabilities[person]["trait"]:
+            probabilities[person]["trait"][value] = traits[value]
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
 
     # Print results
+    print_probabilities(people, probabilities)
+
+
+def print_probabilities(people, probabilities):
+    """
+    Print each person's gene and trait distributions.
+    """
     for person in people:
         print(f"{person}:")
         for field in probabilities[person]:
@@ -128,6 +159,147 @@ def powerset(s):
     ]
 
 
+def subsets(s):
+    """
+    Yield every subset of set s, one at a time.
+    """
+    s = list(s)
+    for r in range(len(s) + 1):
+        for subset in itertools.combinations(s, r):
+            yield set(subset)
+
+
+def trait_assignments(people):
+    """
+    Yield every set of people who might have the trait, without ever
+    producing a set that contradicts a known trait.
+    """
+    known = {person for person in people if people[person]["trait"]}
+    unknown = [
+        person for person in people if people[person]["trait"] is None
+    ]
+    for extra in subsets(unknown):
+        yield known | extra
+
+
+def log(p):
+    """
+    Return the natural log of probability p, or -inf if p is 0.
+    """
+    return math.log(p) if p > 0 else -math.inf
+
+
+@functools.lru_cache
+def inheritance_table(mutation):
+    """
+    Return the probability that a child has each number of copies of the
+    gene, as nested tuples indexed by [mother][father][child] copy
+    counts. Cached by mutation rate.
+    """
+    # Chance of passing the gene on for each number of copies
+    passing = [mutation, 0.5, 1 - mutation]
+    return tuple(
+        tuple(
+            (
+                (1 - mother) * (1 - father),
+                mother * (1 - father) + (1 - mother) * father,
+                mother * father
+            )
+            for father in passing
+        )
+        for mother in passing
+    )
+
+
+def log_tables(mutation):
+    """
+    Return log probability tables as tuples indexed by copy counts: the
+    prior of each copy count, the inheritance of the gene indexed by
+    [mother][father][child] and the trait indexed by [copies][trait].
+    The prior and trait tables are read from `PROBS` on every call.
+    """
+    prior = tuple(log(PROBS["gene"][copies]) for copies in range(3))
+
+    inheritance = tuple(
+        tuple(tuple(log(p) for p in child) for child in father)
+        for father in inheritance_table(mutation)
+    )
+
+    trait = tuple(
+        (log(PROBS["trait"][copies][False]), log(PROBS["trait"][copies][True]))
+        for copies in range(3)
+    )
+    return prior, inheritance, trait
+
+
+class JointKernel():
+    """
+    A family from `load_data` prepared for scoring many assignments:
+    people are numbered in the order they appear, and an assignment is a
+    list of everyone's gene copy counts and a list of 0 or 1 for whether
+    each has the trait.
+
+    The kernel holds the family's structure and `PROBS` as they are when
+    it is built, so build a new one after changing either. The mutation
+    rate defaults to `PROBS["mutation"]`.
+    """
+
+    def __init__(self, people, mutation=None):
+        if mutation is None:
+            mutation = PROBS["mutation"]
+        self.names = list(people)
+        self.index = index = {name: i for i, name in enumerate(self.names)}
+        self.prior, self.inheritance, self.trait = log_tables(mutation)
+        self.founders = [
+            i for i, name in enumerate(self.names)
+            if people[name]["mother"] is None
+        ]
+
+        # (mother, father, child) numbers for everyone with parents
+        self.children = [
+            (index[people[name]["mother"]], index[people[name]["father"]], i)
+            for i, name in enumerate(self.names)
+            if people[name]["mother"] is not None
+        ]
+
+    def encode(self, one_gene, two_genes, have_trait):
+        """
+        Return the copy count and trait lists for an assignment given as
+        sets, like the arguments of `joint_probability`.
+        """
+        copies = [0] * len(self.names)
+        for name in one_gene:
+            copies[self.index[name]] = 1
+        for name in two_genes:
+            copies[self.index[name]] = 2
+        return copies, self.traits(have_trait)
+
+    def traits(self, have_trait):
+        """
+        Return the trait list for everyone in set `have_trait` having
+        the trait and nobody else.
+        """
+        traits = [0] * len(self.names)
+        for name in have_trait:
+            traits[self.index[name]] = 1
+        return traits
+
+    def log_joint(self, copies, traits):
+        """
+        Return the log joint probability of an assignment, as a sum of
+        table lookups.
+        """
+        prior, inheritance, trait = self.prior, self.inheritance, self.trait
+        score = 0.0
+        for i in self.founders:
+            score += prior[copies[i]]
+        for mother, father, i in self.children:
+            score += inheritance[copies[mother]][copies[father]][copies[i]]
+        for c, t in zip(copies, traits):
+            score += trait[c][t]
+        return score
+
+
 def joint_probability(people, one_gene, two_genes, have_trait):
     """
     Compute and return a joint probability.
@@ -139,64 +311,9 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
-    #Probability of a gene
-    gene_prob = 0
-    trait_prob = 0
-    combine_prob = 1
-
-    for person in people:
-        #Getting parents names
-        mother = people[person]["mother"]
-        father = people[person]["father"]
-        #Probability of a gene for each parent
-        parent_probs = {mother: 0, father: 0}
-        if mother == None and father == None:
-            #Person with no gene copies
-            if person not in one_gene and person not in two_genes:
-                copies = 0
-                prob = PROBS["gene"][copies]
-            #Person with 1 gene copy
-            elif person in one_gene:
-                copies = 1
-                prob = PROBS["gene"][copies]
-            #Person with 2 gene copies
-            elif person in two_genes:
-                copies = 2
-                prob = PROBS["gene"][copies]
-            gene_prob = prob
-        #Father and Mother are not none
-        else:
-            for parent in parent_probs:
-                if parent not in one_gene and parent not in two_genes:
-                        #If no gene, then the chance of passing it on is the probability for the gene to mutate
-                        parent_probs[parent] = PROBS["mutation"]
-                elif parent in one_gene:
-                        #If one gene
-                        parent_probs[parent] = (1 - PROBS["mutation"]) * 0.5
-                elif parent in two_genes:
-                        #If two genes
-                        parent_probs[parent] = 1 - PROBS["mutation"]
-            #Total probabilities if person has a gene
-            if person not in one_gene and person not in two_genes:
-                copies = 0
-                gene_prob = (1 - parent_probs[mother]) * (1 - parent_probs[father])
-            elif person in one_gene:
-                copies = 1
-                #Probabiblity of a gene is probability of getting it from one parent but not from the other
-                prob1 = parent_probs[mother] * (1 - parent_probs[father])
-                prob2 = parent_probs[father] * (1 - parent_probs[mother])
-                gene_prob = prob1 + prob2
-            elif person in two_genes:
-                copies = 2
-                #Probability is the product of getting it from both parents
-                gene_prob = parent_probs[mother] * parent_probs[father]
-        #Probability for trait depends on number of genes and if person exhibits the trait
-        if person in have_trait:
-            traits_prob = PROBS["trait"][copies][True]
-        else:
-            traits_prob = PROBS["trait"][copies][False]
-        combinedProb *= gene_prob * trait_prob
-    return combinedProb
+    kernel = JointKernel(people)
+    score = kernel.log_joint(*kernel.encode(one_gene, two_genes, have_trait))
+    return math.exp(score)
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -206,7 +323,16 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
     Which value for each distribution is updated depends on whether
     the person is in `have_gene` and `have_trait`, respectively.
     """
-    raise NotImplementedError
+    for person in probabilities:
+        #Number of gene copies the person has in this assignment
+        if person in two_genes:
+            copies = 2
+        elif person in one_gene:
+            copies = 1
+        else:
+            copies = 0
+        probabilities[person]["gene"][copies] += p
+        probabilities[person]["trait"][person in have_trait] += p
 
 
 def normalize(probabilities):
@@ -214,7 +340,12 @@ def normalize(probabilities):
     Update `probabilities` such that each probability distribution
     is normalized (i.e., sums to 1, with relative proportions the same).
     """
-    raise NotImplementedError
+    for person in probabilities:
+        for field in probabilities[person]:
+            #Dividing every value by the total keeps their proportions
+            total = sum(probabilities[person][field].values())
+            for value in probabilities[person][field]:
+                probabilities[person][field][value] /= total
 
 
 if __name__ == "__main__":
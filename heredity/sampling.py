@@ -0,0 +1,449 @@
+import argparse
+import multiprocessing
+import time
+
+import numpy as np
+
+from elimination import COPIES, inheritance_table
+from heredity import PROBS, load_data
+from vectorized import Family
+
+METHODS = ["gibbs", "likelihood"]
+
+# Independent tasks the work is split into, used both to spread it
+# across processes and to estimate the standard error of each marginal
+TASKS = 8
+
+# Chains advanced together in each Gibbs task, and samples drawn
+# together in each likelihood weighting batch
+CHAINS = 16
+BATCH = 1024
+
+
+class Model():
+    """
+    The arrays both samplers need for a family: everyone's parents,
+    the log probability tables and the observed traits as evidence.
+    """
+
+    def __init__(self, people):
+        family = Family(people)
+        self.names = family.names
+        self.mothers = family.mothers
+        self.fathers = family.fathers
+        self.observed = family.observed
+        n = len(family)
+
+        self.prior = np.array([PROBS["gene"][c] for c in COPIES])
+        self.inheritance = inheritance_table(PROBS["mutation"])
+        self.trait = np.array([PROBS["trait"][c][True] for c in COPIES])
+
+        # Likelihood of each person's evidence for each copy count
+        self.evidence = np.ones((n, 3))
+        for i in np.flatnonzero(family.observed):
+            if family.traits[i]:
+                self.evidence[i] = self.trait
+            else:
+                self.evidence[i] = 1 - self.trait
+        self.traits = family.traits
+
+        self.levels = levels(self.mothers, self.fathers)
+        self.colours = colour_classes(self.mothers, self.fathers)
+
+    def __len__(self):
+        return len(self.names)
+
+
+def levels(mothers, fathers):
+    """
+    Group people by generation: founders first, then everyone whose
+    parents are in earlier groups.
+    """
+    n = len(mothers)
+    depth = np.full(n, -1)
+    depth[mothers < 0] = 0
+    while (depth < 0).any():
+        pending = np.flatnonzero(depth < 0)
+        ready = pending[
+            (depth[mothers[pending]] >= 0) & (depth[fathers[pending]] >= 0)
+        ]
+        if len(ready) == 0:
+            raise Exception("Family tree has a cycle.")
+        depth[ready] = np.maximum(
+            depth[mothers[ready]], depth[fathers[ready]]
+        ) + 1
+    return [np.flatnonzero(depth == d) for d in range(depth.max() + 1)]
+
+
+def colour_classes(mothers, fathers):
+    """
+    Split people into groups where nobody's gene distribution depends on
+    anyone else's in the same group given everyone outside it, so a
+    whole group can be resampled at once. Greedily colours the graph
+    joining each person to their parents, children and co-parents.
+    """
+    n = len(mothers)
+    neighbours = [set() for _ in range(n)]
+    for child in np.flatnonzero(mothers >= 0):
+        family = [mothers[child], fathers[child], child]
+        for a in family:
+            neighbours[a].update(family)
+    colours = np.full(n, -1)
+    for person in sorted(range(n), key=lambda p: -len(neighbours[p])):
+        used = {colours[p] for p in neighbours[person]}
+        colour = 0
+        while colour in used:
+            colour += 1
+        colours[person] = colour
+    return [np.flatnonzero(colours == c) for c in range(colours.max() + 1)]
+
+
+def draw(probabilities, rng):
+    """
+    Draw a copy count from each distribution along the last axis, which
+    need not be normalized.
+    """
+    # Numpy reduces short last axes slowly, so the three copy counts
+    # are handled as separate arrays
+    zero = probabilities[..., 0]
+    one = zero + probabilities[..., 1]
+    u = rng.random(zero.shape) * (one + probabilities[..., 2])
+    return (u >= zero).astype(np.intp) + (u >= one)
+
+
+def likelihood_task(model, seed, samples, deadline):
+    """
+    Draw up to `samples` likelihood-weighted samples in batches until
+    `deadline`. Return (log scale, weight total, total of squared
+    weights, weighted gene totals, weighted trait totals, samples
+    drawn), with weights relative to exp(log scale).
+
+    Genes are sampled generation by generation from the prior and
+    inheritance table. Observed traits are not sampled but weight the
+    sample by their likelihood, and unobserved traits are counted by
+    their probability given the sampled genes.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(model)
+    scale = -np.inf
+    weight_total = 0.0
+    square_total = 0.0
+    gene_totals = np.zeros((n, 3))
+    trait_totals = np.zeros(n)
+    drawn = 0
+    while drawn < samples and (time.time() < deadline or drawn == 0):
+        size = min(BATCH, samples - drawn)
+        genes = np.zeros((size, n), dtype=np.intp)
+        for level in model.levels:
+            founders = level[model.mothers[level] < 0]
+            children = level[model.mothers[level] >= 0]
+            genes[:, founders] = draw(
+                np.broadcast_to(model.prior, (size, len(founders), 3)), rng
+            )
+            genes[:, children] = draw(model.inheritance[
+                genes[:, model.mothers[children]],
+                genes[:, model.fathers[children]]
+            ], rng)
+
+        people = np.arange(n)
+        log_weights = np.log(model.evidence[people, genes]).sum(axis=1)
+
+        # Keep running totals relative to the largest weight seen
+        top = log_weights.max()
+        if top > scale:
+            factor = np.exp(scale - top)
+            weight_total *= factor
+            square_total *= factor ** 2
+            gene_totals *= factor
+            trait_totals *= factor
+            scale = top
+        weights = np.exp(log_weights - scale)
+        weight_total += weights.sum()
+        square_total += (weights ** 2).sum()
+        for copies in COPIES:
+            gene_totals[:, copies] += weights @ (genes == copies)
+        trait_totals += weights @ model.trait[genes]
+        drawn += size
+    return (scale, weight_total, square_total, gene_totals, trait_totals,
+            drawn)
+
+
+def gibbs_task(model, seed, samples, deadline):
+    """
+    Run CHAINS Gibbs chains for up to `samples` sweeps, or until
+    `deadline`. Return each chain's mean gene distributions
+    (CHAINS x N x 3), mean trait probabilities (CHAINS x N) and the
+    number of sweeps kept.
+
+    Each sweep resamples one colour class of people at a time from
+    their distribution given their parents, children and co-parents.
+    Unobserved traits are summed out, and estimates average these full
+    conditional distributions rather than the sampled values.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(model)
+    mothers, fathers = model.mothers, model.fathers
+    log_prior = np.log(model.prior)
+    log_evidence = np.log(model.evidence)
+
+    # Log inheritance tables for a parent's copy count, indexed by
+    # (whether that parent is the father, other parent, child, parent)
+    log_inheritance = np.log(model.inheritance)
+    as_parent = np.stack([
+        log_inheritance.transpose(1, 2, 0),
+        log_inheritance.transpose(0, 2, 1)
+    ])
+
+    # For each colour class, the (parent, child) links out of it sorted
+    # by parent, and where each parent's run of links starts
+    children = np.flatnonzero(mothers >= 0)
+    parents = np.concatenate([mothers[children], fathers[children]])
+    kids = np.concatenate([children, children])
+    others = np.concatenate([fathers[children], mothers[children]])
+    father = (np.arange(len(kids)) >= len(children)).astype(np.intp)
+    links = []
+    for colour in model.colours:
+        local = np.full(n, -1)
+        local[colour] = np.arange(len(colour))
+        chosen = np.flatnonzero(local[parents] >= 0)
+        chosen = chosen[np.argsort(local[parents[chosen]], kind="stable")]
+        owners = local[parents[chosen]]
+        starts = np.flatnonzero(np.diff(owners, prepend=-1))
+        links.append((owners[starts], starts, kids[chosen], others[chosen],
+                      father[chosen]))
+
+    # Genes are stored person by chain, so each person's row is
+    # contiguous; every chain starts from a sample of the prior
+    genes = np.zeros((n, CHAINS), dtype=np.intp)
+    for level in model.levels:
+        founders = level[mothers[level] < 0]
+        born = level[mothers[level] >= 0]
+        genes[founders] = draw(
+            np.broadcast_to(model.prior, (len(founders), CHAINS, 3)), rng
+        )
+        genes[born] = draw(
+            model.inheritance[genes[mothers[born]], genes[fathers[born]]],
+            rng
+        )
+
+    # Estimates average the sweeps since the start of the previous
+    # power-of-two block, so however long the chains run, between a
+    # quarter and a half of their sweeps are discarded as burn-in
+    previous = np.zeros((n, CHAINS, 3))
+    current = np.zeros((n, CHAINS, 3))
+    previous_start = current_start = 0
+    sweep = 0
+    while sweep < samples and (time.time() < deadline or sweep == 0):
+        for colour, (owners, starts, kids, others, father) in zip(
+                model.colours, links):
+            # Log conditional of each copy count for everyone in colour
+            logits = np.repeat(log_evidence[colour][:, None], CHAINS, axis=1)
+            founder = mothers[colour] < 0
+            logits[founder] += log_prior
+            born = colour[~founder]
+            logits[~founder] += log_inheritance[
+                genes[mothers[born]], genes[fathers[born]]
+            ]
+            if len(kids):
+                terms = as_parent[father[:, None], genes[others], genes[kids]]
+                logits[owners] += np.add.reduceat(terms, starts, axis=0)
+
+            top = np.maximum(np.maximum(logits[..., 0], logits[..., 1]),
+                             logits[..., 2])
+            conditional = np.exp(logits - top[..., None])
+            conditional /= (conditional[..., 0] + conditional[..., 1]
+                            + conditional[..., 2])[..., None]
+            genes[colour] = draw(conditional, rng)
+            current[colour] += conditional
+        sweep += 1
+        if sweep & (sweep - 1) == 0:
+            previous, current = current, previous
+            current[:] = 0
+            previous_start, current_start = current_start, sweep
+
+    kept = sweep - previous_start
+    gene_totals = (previous + current).transpose(1, 0, 2)
+    gene_means = gene_totals / kept
+    return gene_means, gene_means @ model.trait, kept
+
+
+# Model of the current worker process in `estimate`
+worker_model = None
+
+
+def init_worker(model):
+    global worker_model
+    worker_model = model
+
+
+def sample_worker(task):
+    """
+    Run one likelihood weighting or Gibbs task in a pool worker.
+    """
+    method, seed, samples, deadline = task
+    if method == "gibbs":
+        return gibbs_task(worker_model, seed, samples, deadline)
+    return likelihood_task(worker_model, seed, samples, deadline)
+
+
+def binomial_error(p, n):
+    """
+    Return the standard error of proportions `p` estimated from `n`
+    independent samples, with the Agresti-Coull adjustment of adding
+    two successes and two failures, so that proportions of 0 or 1 from
+    few samples are not given an error of 0.
+    """
+    adjusted = (n * p + 2) / (n + 4)
+    return np.sqrt(adjusted * (1 - adjusted) / (n + 4))
+
+
+class Estimate():
+    """
+    Estimated gene (N x 3) and trait (N) marginals, with the standard
+    error of each, its effective sample size, and the total number of
+    samples or sweeps.
+
+    Without `ess`, the effective sample size of each marginal is the
+    number of independent exact samples that would give its error.
+    """
+
+    def __init__(self, names, genes, traits, gene_errors, trait_errors,
+                 samples, ess=None):
+        self.names = names
+        self.genes = genes
+        self.traits = traits
+        self.gene_errors = gene_errors
+        self.trait_errors = trait_errors
+        self.samples = samples
+
+        if ess is not None:
+            self.gene_ess = np.full(genes.shape, ess)
+            self.trait_ess = np.full(traits.shape, ess)
+            return
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.gene_ess = genes * (1 - genes) / gene_errors ** 2
+            self.trait_ess = traits * (1 - traits) / trait_errors ** 2
+
+    def probabilities(self):
+        """
+        Return the estimates in the form computed by `heredity.main`.
+        """
+        return {
+            name: {
+                "gene": {c: float(self.genes[i, c]) for c in [2, 1, 0]},
+                "trait": {
+                    True: float(self.traits[i]),
+                    False: float(1 - self.traits[i])
+                }
+            }
+            for i, name in enumerate(self.names)
+        }
+
+
+def estimate(people, method="gibbs", samples=1000, budget=None,
+             tasks=TASKS, processes=None, seed=None):
+    """
+    Estimate gene and trait marginals for everyone in `people`, as
+    loaded by `load_data`, by Gibbs sampling or likelihood weighting.
+
+    The work is split into `tasks` independent tasks, each drawing up to
+    `samples` samples (or Gibbs sweeps per chain) and stopping early
+    once `budget` seconds have passed, though never before its first
+    sample. With `processes`, tasks run in a pool of that many worker
+    processes.
+    """
+    if method not in METHODS:
+        raise Exception(f"Unknown method {method}.")
+    model = Model(people)
+    deadline = float("inf") if budget is None else time.time() + budget
+    seeds = np.random.SeedSequence(seed).spawn(tasks)
+    jobs = [(method, seeds[i], samples, deadline) for i in range(tasks)]
+    if processes is None:
+        init_worker(model)
+        results = list(map(sample_worker, jobs))
+    else:
+        with multiprocessing.Pool(processes, init_worker, (model,)) as pool:
+            results = pool.map(sample_worker, jobs)
+
+    if method == "gibbs":
+        genes = np.concatenate([result[0] for result in results])
+        traits = np.concatenate([result[1] for result in results])
+        total = sum(result[2] * len(result[0]) for result in results)
+    else:
+        # Each task's ratio estimate, and the pooled estimate
+        scale = max(result[0] for result in results)
+        factors = [np.exp(result[0] - scale) for result in results]
+        genes = np.array([result[3] / result[1] for result in results])
+        traits = np.array([result[4] / result[1] for result in results])
+        weights = sum(f * result[1] for f, result in zip(factors, results))
+        squares = sum(
+            f ** 2 * result[2] for f, result in zip(factors, results)
+        )
+        pooled_genes = sum(
+            f * result[3] for f, result in zip(factors, results)
+        ) / weights
+        pooled_traits = sum(
+            f * result[4] for f, result in zip(factors, results)
+        ) / weights
+        total = sum(result[5] for result in results)
+
+        # Kish's effective sample size of all the weighted samples
+        ess = weights ** 2 / squares
+
+    # Standard error of the mean of the independent estimates
+    runs = len(genes)
+    gene_errors = genes.std(axis=0, ddof=1) / np.sqrt(runs)
+    trait_errors = traits.std(axis=0, ddof=1) / np.sqrt(runs)
+    if method == "gibbs":
+        genes = genes.mean(axis=0)
+        traits = traits.mean(axis=0)
+        ess = None
+    else:
+        # When a few samples carry almost all the weight, every task can
+        # agree on them, so the error is at least that of `ess`
+        # independent samples
+        genes, traits = pooled_genes, pooled_traits
+        gene_errors = np.maximum(gene_errors, binomial_error(genes, ess))
+        trait_errors = np.maximum(trait_errors, binomial_error(traits, ess))
+
+    # Observed traits are known exactly
+    traits = np.where(model.observed, model.traits, traits)
+    trait_errors = np.where(model.observed, 0, trait_errors)
+    return Estimate(model.names, genes, traits, gene_errors, trait_errors,
+                    total, ess)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Estimate gene and trait probabilities by sampling."
+    )
+    parser.add_argument("data")
+    parser.add_argument("--method", choices=METHODS, default="gibbs")
+    parser.add_argument("--samples", type=int, default=1000,
+                        help="samples, or sweeps per chain, per task")
+    parser.add_argument("--budget", type=float,
+                        help="seconds to stop sampling after")
+    parser.add_argument("--tasks", type=int, default=TASKS)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    people = load_data(args.data)
+    result = estimate(people, args.method, args.samples, args.budget,
+                      args.tasks, args.processes, args.seed)
+    print(f"Estimates from {result.samples} samples ({args.method})")
+    for i, person in enumerate(result.names):
+        print(f"{person}:")
+        print("  Gene:")
+        for c in [2, 1, 0]:
+            print(f"    {c}: {result.genes[i, c]:.4f} "
+                  f"± {result.gene_errors[i, c]:.4f} "
+                  f"(ESS {result.gene_ess[i, c]:.0f})")
+        print("  Trait:")
+        print(f"    True: {result.traits[i]:.4f} "
+              f"± {result.trait_errors[i]:.4f}")
+        print(f"    False: {1 - result.traits[i]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import sys
+
+import numpy as np
+
+from elimination import COPIES, inheritance_table
+from heredity import PROBS, load_data, print_probabilities
+
+# Assignments scored at once by `probabilities`
+BLOCK_SIZE = 1 << 16
+
+
+class Family():
+    """
+    A family from `load_data` encoded as integer arrays: people are
+    numbered in the order they appear, and the mother and father of
+    person i are people `mothers[i]` and `fathers[i]`, or -1.
+    """
+
+    def __init__(self, people):
+        self.names = list(people)
+        index = {name: i for i, name in enumerate(self.names)}
+        self.mothers = np.array([
+            index[people[name]["mother"]]
+            if people[name]["mother"] is not None else -1
+            for name in self.names
+        ], dtype=np.intp)
+        self.fathers = np.array([
+            index[people[name]["father"]]
+            if people[name]["father"] is not None else -1
+            for name in self.names
+        ], dtype=np.intp)
+        self.founders = np.flatnonzero(self.mothers < 0)
+        self.children = np.flatnonzero(self.mothers >= 0)
+
+        # Observed traits, and the people whose trait is unknown
+        self.observed = np.array(
+            [people[name]["trait"] is not None for name in self.names]
+        )
+        self.traits = np.array(
+            [bool(people[name]["trait"]) for name in self.names]
+        )
+        self.unknown = np.flatnonzero(~self.observed)
+
+        with np.errstate(divide="ignore"):
+            self.log_gene = np.log([PROBS["gene"][c] for c in COPIES])
+            self.log_inheritance = np.log(inheritance_table(PROBS["mutation"]))
+            self.log_trait = np.log([
+                [PROBS["trait"][c][False], PROBS["trait"][c][True]]
+                for c in COPIES
+            ])
+
+    def __len__(self):
+        return len(self.names)
+
+    def log_joint(self, genes, traits):
+        """
+        Return the log joint probability of each row of a block of
+        assignments, given as B x N arrays of gene copy counts and
+        booleans for whether each person has the trait.
+        """
+        scores = self.log_gene[genes[:, self.founders]].sum(axis=1)
+        children = self.children
+        scores += self.log_inheritance[
+            genes[:, self.mothers[children]],
+            genes[:, self.fathers[children]],
+            genes[:, children]
+        ].sum(axis=1)
+        scores += self.log_trait[genes, traits.astype(np.intp)].sum(axis=1)
+        return scores
+
+    def assignments(self, start, stop):
+        """
+        Return the gene and trait arrays for assignments numbered `start`
+        to `stop`. Assignment k gives person i the i-th base-3 digit of
+        k // 2^U copies, and the unknown traits follow the bits of
+        k mod 2^U, where U is the number of unknown traits.
+        """
+        k = np.arange(start, stop, dtype=np.int64)
+        bits = len(self.unknown)
+        gene_codes = k >> bits
+        powers = 3 ** np.arange(len(self), dtype=np.int64)
+        genes = (gene_codes[:, None] // powers) % 3
+
+        traits = np.broadcast_to(self.traits, (len(k), len(self))).copy()
+        shifts = np.arange(bits, dtype=np.int64)
+        traits[:, self.unknown] = (k[:, None] >> shifts) & 1
+        return genes, traits
+
+    def count(self):
+        """
+        Return the number of assignments consistent with the observed
+        traits.
+        """
+        return 3 ** len(self) << len(self.unknown)
+
+
+def probabilities(people, block_size=BLOCK_SIZE):
+    """
+    Return gene and trait distributions for everyone in `people`, as
+    loaded by `load_data`, by scoring every assignment consistent with
+    the observed traits in blocks of `block_size` at a time. The result
+    has the same form as in `heredity.main`.
+    """
+    family = Family(people)
+    gene_totals = np.zeros((len(family), 3))
+    trait_totals = np.zeros((len(family), 2))
+    total = 0.0
+
+    count = family.count()
+    for start in range(0, count, block_size):
+        genes, traits = family.assignments(
+            start, min(start + block_size, count)
+        )
+        p = np.exp(family.log_joint(genes, traits))
+
+        # Adding each assignment's probability to the values it assigns
+        # is a weighted sum over the block for every person and value
+        for copies in COPIES:
+            gene_totals[:, copies] += p @ (genes == copies)
+        trait_totals[:, 0] += p @ ~traits
+        trait_totals[:, 1] += p @ traits
+        total += p.sum()
+
+    gene_totals /= total
+    trait_totals /= total
+    return {
+        name: {
+            "gene": {c: float(gene_totals[i, c]) for c in [2, 1, 0]},
+            "trait": {
+                True: float(trait_totals[i, 1]),
+                False: float(trait_totals[i, 0])
+            }
+        }
+        for i, name in enumerate(family.names)
+    }
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python vectorized.py data.csv")
+    people = load_data(sys.argv[1])
+    print_probabilities(people, probabilities(people))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 import itertools
 
+from sat import Solver
+
+# Models evaluated at once by truth_table_check, as a power of two
+BLOCK_BITS = 16
+
 
 class Sentence():
 
@@ -225,39 +230,220 @@ class Biconditional(Sentence):
         return set.union(self.left.symbols(), self.right.symbols())
 
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
+class Compiled():
+    """
+    A sentence compiled to a Python function over bitsets: each symbol's
+    truth values across many models are the bits of one integer, so a
+    single pass of bitwise operations evaluates every model at once.
+    """
+
+    def __init__(self, sentence, symbols=None):
+        Sentence.validate(sentence)
+        if symbols is None:
+            symbols = sorted(sentence.symbols())
+        self.symbols = list(symbols)
+        index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        missing = sentence.symbols() - set(index)
+        if missing:
+            raise Exception(f"symbols {sorted(missing)} not in symbols")
+
+        # One line of code per compound subsentence, each assigning to a
+        # new register, so deep sentences do not nest expressions
+        lines = []
+        registers = {}
+
+        def emit(sentence):
+            if isinstance(sentence, Symbol):
+                return f"v[{index[sentence.name]}]"
+            key = id(sentence)
+            if key in registers:
+                return registers[key][1]
+            if isinstance(sentence, Not):
+                code = f"mask ^ {emit(sentence.operand)}"
+            elif isinstance(sentence, And):
+                operands = [emit(c) for c in sentence.conjuncts]
+                code = " & ".join(operands) or "mask"
+            elif isinstance(sentence, Or):
+                operands = [emit(d) for d in sentence.disjuncts]
+                code = " | ".join(operands) or "0"
+            elif isinstance(sentence, Implication):
+                antecedent = emit(sentence.antecedent)
+                code = f"(mask ^ {antecedent}) | {emit(sentence.consequent)}"
+            elif isinstance(sentence, Biconditional):
+                code = f"mask ^ {emit(sentence.left)} ^ {emit(sentence.right)}"
+            else:
+                raise Exception(f"cannot compile {type(sentence).__name__}")
+            register = f"r{len(lines)}"
+            lines.append(f"    {register} = {code}")
+            registers[key] = (sentence, register)
+            return register
+
+        result = emit(sentence)
+        source = "\n".join(
+            ["def evaluate(v, mask):"] + lines + [f"    return {result}"]
+        )
+        namespace = {}
+        exec(source, namespace)
+        self.function = namespace["evaluate"]
+        self.source = source
+
+    def __call__(self, values, mask):
+        """
+        Evaluates the sentence for the models given by one bitset per
+        symbol, returning a bitset with the bits of `mask` set for
+        models in which the sentence is true.
+        """
+        return self.function(values, mask) & mask
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
+    def evaluate(self, model):
+        """Evaluates the sentence in a single model."""
+        try:
+            values = [int(bool(model[symbol])) for symbol in self.symbols]
+        except KeyError as e:
+            raise Exception(f"variable {e.args[0]} not in model")
+        return bool(self(values, 1))
+
+    def truth_table(self, start=0, bits=None):
+        """
+        Returns the truth of the sentence in the 2^bits models numbered
+        from `start`, a multiple of 2^bits, as a bitset with bit i for
+        model start + i. Model m gives symbol j the value of bit j of m.
+        By default, covers all models.
+        """
+        if bits is None:
+            bits = len(self.symbols)
+        size = 1 << bits
+        if start % size:
+            raise Exception("start must be a multiple of 2^bits")
+        mask = (1 << size) - 1
+        values = []
+        for j in range(len(self.symbols)):
+            if j < bits:
+                # Runs of 2^j zeros then 2^j ones, repeated
+                period = 1 << (j + 1)
+                run = ((1 << (1 << j)) - 1) << (1 << j)
+                values.append(mask // ((1 << period) - 1) * run)
+            else:
+                values.append(mask if start >> j & 1 else 0)
+        return self(values, mask)
+
+
+def truth_table_check(knowledge, query, block_bits=BLOCK_BITS):
+    """
+    Checks if knowledge base entails query by evaluating every model,
+    2^block_bits models at a time.
+    """
+    compiled = Compiled(Implication(knowledge, query))
+    bits = min(block_bits, len(compiled.symbols))
+    everything = (1 << (1 << bits)) - 1
+    for start in range(0, 1 << len(compiled.symbols), 1 << bits):
+        if compiled.truth_table(start, bits) != everything:
+            return False
+    return True
+
+
+class CNF():
+    """
+    Clauses for a sat.Solver equisatisfiable with the sentences added,
+    built by Tseitin encoding: every compound subsentence gets a new
+    variable defined by clauses to be equivalent to it, so the clauses
+    grow linearly with the sentences rather than exponentially.
+    """
+
+    def __init__(self):
+        self.variables = 0
+        self.clauses = []
+        self.symbols = {}
+        self.defined = {}
+        self.true = None
+
+    def variable(self):
+        """Returns a new variable."""
+        self.variables += 1
+        return self.variables
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to a sentence."""
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.symbols:
+                self.symbols[sentence.name] = self.variable()
+            return self.symbols[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+
+        # Subsentences shared between sentences are defined once
+        key = id(sentence)
+        if key in self.defined:
+            return self.defined[key][1]
+        if isinstance(sentence, And):
+            literals = [self.literal(c) for c in sentence.conjuncts]
+            x = self.conjunction(literals)
+        elif isinstance(sentence, Or):
+            literals = [self.literal(d) for d in sentence.disjuncts]
+            x = -self.conjunction([-literal for literal in literals])
+        elif isinstance(sentence, Implication):
+            x = -self.conjunction([self.literal(sentence.antecedent),
+                                   -self.literal(sentence.consequent)])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            x = self.variable()
+            self.clauses += [[-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]]
         else:
+            raise Exception(f"cannot encode {type(sentence).__name__}")
+
+        # Keep the sentence alive so its id is not reused
+        self.defined[key] = (sentence, x)
+        return x
+
+    def conjunction(self, literals):
+        """Returns a new variable equivalent to a conjunction of literals."""
+        if not literals:
+            if self.true is None:
+                self.true = self.variable()
+                self.clauses.append([self.true])
+            return self.true
+        x = self.variable()
+        self.clauses += [[-x, literal] for literal in literals]
+        self.clauses.append([x] + [-literal for literal in literals])
+        return x
+
+    def add(self, sentence):
+        """Adds clauses that hold exactly when the sentence is true."""
+        negated = isinstance(sentence, Not)
+        if negated:
+            sentence = sentence.operand
+
+        # Conjunctions and disjunctions at the top need no new variables
+        if negated and isinstance(sentence, Not):
+            self.add(sentence.operand)
+        elif isinstance(sentence, And) and not negated:
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or) and negated:
+            for disjunct in sentence.disjuncts:
+                self.add(Not(disjunct))
+        elif isinstance(sentence, And):
+            self.clauses.append([-self.literal(c) for c in sentence.conjuncts])
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(d) for d in sentence.disjuncts])
+        elif isinstance(sentence, Implication) and not negated:
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
+        else:
+            literal = self.literal(sentence)
+            self.clauses.append([-literal if negated else literal])
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+    def solver(self):
+        """Returns a sat.Solver for the clauses."""
+        return Solver(self.variables, self.clauses)
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    # Knowledge entails query if no model has knowledge true and query false
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return not cnf.solver().solve()
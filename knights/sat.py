@@ -0,0 +1,307 @@
+import heapq
+
+# Conflicts before the first restart; later restarts follow the Luby
+# sequence 1, 1, 2, 1, 1, 2, 4, ... times this
+RESTART_INTERVAL = 100
+
+# Learnt clauses kept before the first reduction, and how many more
+# each later reduction allows
+LEARNT_LIMIT = 2000
+LEARNT_INCREMENT = 300
+
+# Factor by which the activity of variables in recent conflicts grows
+# relative to older ones
+ACTIVITY_DECAY = 0.95
+
+
+def luby(i):
+    """Returns the i-th term (from 1) of the Luby sequence."""
+    size = 1
+    while size < i + 1:
+        size = 2 * size + 1
+    while size - 1 != i:
+        size //= 2
+        i %= size
+    return (size + 1) // 2
+
+
+class Solver():
+    """
+    A CDCL SAT solver for clauses over variables numbered 1 to
+    `variables`, with each clause a list of literals: v for variable v
+    being true and -v for it being false.
+
+    Clauses are watched by two of their literals, so assigning a literal
+    only visits the clauses watching its negation. Conflicts are analysed
+    to their first unique implication point and the learnt clause decides
+    how far to backjump; decisions follow the variables most involved in
+    recent conflicts, each set to the value it last had.
+    """
+
+    def __init__(self, variables, clauses=()):
+        self.variables = variables
+
+        # Truth of each literal, indexed by the literal itself, so the
+        # negative literals wrap around to the back of the list
+        self.value = [None] * (2 * variables + 1)
+        self.level = [0] * (variables + 1)
+        self.reason = [None] * (variables + 1)
+        self.watches = [[] for _ in range(2 * variables + 1)]
+        self.trail = []
+        self.limits = []
+        self.head = 0
+
+        self.activity = [0.0] * (variables + 1)
+        self.increment = 1.0
+        self.phase = [False] * (variables + 1)
+        self.heap = [(0.0, v) for v in range(1, variables + 1)]
+
+        # Learnt clauses with the number of decision levels among their
+        # literals when learnt, which predicts how useful they stay
+        self.learnt = []
+        self.learnt_limit = LEARNT_LIMIT
+        self.unsatisfiable = False
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def add_clause(self, literals):
+        """
+        Adds a clause before solving, simplifying it against the
+        literals already known to hold.
+        """
+        clause = []
+        for literal in literals:
+            if not 0 < abs(literal) <= self.variables:
+                raise Exception(f"literal {literal} out of range")
+            if self.value[literal] is True or -literal in clause:
+                return
+            if self.value[literal] is None and literal not in clause:
+                clause.append(literal)
+        if not clause:
+            self.unsatisfiable = True
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            if self.propagate() is not None:
+                self.unsatisfiable = True
+        else:
+            self.watch(clause)
+
+    def watch(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def assign(self, literal, reason):
+        self.value[literal] = True
+        self.value[-literal] = False
+        variable = abs(literal)
+        self.level[variable] = len(self.limits)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses, returning a clause
+        made false by the assignment or None.
+        """
+        value, watches, trail = self.value, self.watches, self.trail
+        level, reason = self.level, self.reason
+        depth = len(self.limits)
+        while self.head < len(trail):
+            false = -trail[self.head]
+            self.head += 1
+            watching = watches[false]
+            kept = []
+            watches[false] = kept
+            for i, clause in enumerate(watching):
+                # Keep the false literal second in the clause
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                if value[first] is True:
+                    kept.append(clause)
+                    continue
+
+                # Watch another literal that is not false, if any
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if value[literal] is not False:
+                        clause[1], clause[k] = literal, false
+                        watches[literal].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value[first] is False:
+                        kept += watching[i + 1:]
+                        self.head = len(trail)
+                        return clause
+
+                    # The clause is unit, so its first literal must hold
+                    value[first] = True
+                    value[-first] = False
+                    variable = abs(first)
+                    level[variable] = depth
+                    reason[variable] = clause
+                    trail.append(first)
+        return None
+
+    def analyse(self, conflict):
+        """
+        Returns a clause learnt from a conflict, with the literal it
+        asserts first and a literal of the level to backjump to second,
+        the number of decision levels among its literals, and the level
+        to backjump to.
+        """
+        level, reason, trail = self.level, self.reason, self.trail
+        current = len(self.limits)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        index = len(trail) - 1
+        clause = conflict
+        literal = None
+        while True:
+            for q in clause if literal is None else clause[1:]:
+                variable = abs(q)
+                if variable not in seen and level[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if level[variable] == current:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+
+            # The next literal of this level on the trail that was seen
+            while abs(trail[index]) not in seen:
+                index -= 1
+            literal = trail[index]
+            index -= 1
+            clause = reason[abs(literal)]
+            pending -= 1
+            if pending == 0:
+                break
+        learnt[0] = -literal
+
+        # Drop literals implied by the others through their reason
+        learnt[1:] = [
+            q for q in learnt[1:]
+            if reason[abs(q)] is None or any(
+                abs(r) not in seen and level[abs(r)] > 0
+                for r in reason[abs(q)][1:]
+            )
+        ]
+        if len(learnt) == 1:
+            return learnt, 1, 0
+        deepest = max(range(1, len(learnt)),
+                      key=lambda k: level[abs(learnt[k])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        levels = len({level[abs(q)] for q in learnt})
+        return learnt, levels, level[abs(learnt[1])]
+
+    def reduce(self):
+        """
+        Forgets the half of the learnt clauses spanning the most decision
+        levels, except those joining only two levels and those that are
+        the reason for a current assignment.
+        """
+        locked = {
+            id(self.reason[abs(literal)]) for literal in self.trail
+            if self.reason[abs(literal)] is not None
+        }
+        self.learnt.sort(key=lambda entry: entry[0])
+        half = len(self.learnt) // 2
+        kept = []
+        forgotten = set()
+        for i, (levels, clause) in enumerate(self.learnt):
+            if i < half or levels <= 2 or id(clause) in locked:
+                kept.append((levels, clause))
+            else:
+                forgotten.add(id(clause))
+        self.learnt = kept
+        self.watches = [
+            [clause for clause in watching if id(clause) not in forgotten]
+            for watching in self.watches
+        ]
+        self.learnt_limit += LEARNT_INCREMENT
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-a, v) for v, a in enumerate(self.activity)
+                         if v > 0 and self.value[v] is None]
+            heapq.heapify(self.heap)
+        elif self.value[variable] is None:
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+
+    def backjump(self, level):
+        """Undoes every assignment made after decision level `level`."""
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.value[literal] = self.value[-literal] = None
+            self.reason[variable] = None
+            self.phase[variable] = literal > 0
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = start
+
+    def decide(self):
+        """
+        Returns the unassigned variable of highest activity, or None if
+        every variable is assigned.
+        """
+        heap = self.heap
+        while heap:
+            activity, variable = heapq.heappop(heap)
+            if (self.value[variable] is None
+                    and -activity == self.activity[variable]):
+                return variable
+        return None
+
+    def solve(self):
+        """Returns whether the clauses can all be satisfied."""
+        if self.unsatisfiable:
+            return False
+        conflicts = 0
+        restarts = 1
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.limits:
+                    self.unsatisfiable = True
+                    return False
+                learnt, levels, level = self.analyse(conflict)
+                self.backjump(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.watch(learnt)
+                    self.learnt.append((levels, learnt))
+                    self.assign(learnt[0], learnt)
+                if len(self.learnt) >= self.learnt_limit:
+                    self.reduce()
+                self.increment /= ACTIVITY_DECAY
+
+                conflicts += 1
+                if conflicts >= luby(restarts) * RESTART_INTERVAL:
+                    self.backjump(0)
+                    conflicts = 0
+                    restarts += 1
+            else:
+                variable = self.decide()
+                if variable is None:
+                    return True
+                self.limits.append(len(self.trail))
+                self.assign(variable if self.phase[variable] else -variable,
+                            None)
+
+    def model(self):
+        """
+        Returns the truth of every variable, indexed by variable, after
+        `solve` has found the clauses satisfiable.
+        """
+        return [None] + [self.value[v] for v in range(1, self.variables + 1)]
@@ -0,0 +1,282 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import crawler
+import engine
+import pagerank
+import sampler
+from linkgraph import LinkGraph
+from pagerank import DAMPING, SAMPLES
+
+DISTRIBUTIONS = ["powerlaw", "uniform"]
+METHODS = ["crawl", "crawler", "sample_pagerank", "iterate_pagerank",
+           "power_iteration", "sample"]
+
+# Average number of links out of a generated page
+MEAN_DEGREE = 8
+
+# Exponent of the power-law degree distributions
+EXPONENT = 2.1
+
+# Tolerance of the power iteration that stands in for an exact solve
+EXACT_TOLERANCE = 1e-14
+
+REPORT_VERSION = 1
+
+# Runs faster than this are too noisy to flag as slowdowns
+MIN_SECONDS = 0.01
+
+
+def generate_links(pages, distribution, mean_degree=MEAN_DEGREE, seed=None):
+    """
+    Return a random corpus dictionary of `pages` pages named "0.html",
+    "1.html", ...
+
+    With "uniform", every page has about `mean_degree` links to pages
+    chosen uniformly. With "powerlaw", both the number of links out of a
+    page and the popularity of a page as a link target follow power laws,
+    so a few hubs collect most links and some pages have none.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise Exception(f"Unknown distribution {distribution}.")
+    rng = np.random.default_rng(seed)
+    names = [f"{i}.html" for i in range(pages)]
+
+    if distribution == "uniform":
+        degrees = rng.poisson(mean_degree, size=pages)
+        weights = None
+    else:
+        degrees = rng.zipf(EXPONENT, size=pages) - 1
+        degrees = degrees * (mean_degree / max(degrees.mean(), 1))
+        degrees = np.minimum(degrees.astype(np.int64), pages - 1)
+        weights = (np.arange(pages) + 1.0) ** -(1 / (EXPONENT - 1))
+        weights = rng.permutation(weights / weights.sum())
+
+    # Draw every link target at once, then split them between pages
+    targets = rng.choice(pages, size=int(degrees.sum()), p=weights)
+    ends = np.cumsum(degrees)
+    corpus = {}
+    for i, name in enumerate(names):
+        links = targets[ends[i] - degrees[i]:ends[i]]
+        corpus[name] = {names[j] for j in links if j != i}
+    return corpus
+
+
+def write_corpus(corpus, directory):
+    """
+    Write a corpus dictionary as HTML pages in `directory`.
+    """
+    for page, links in corpus.items():
+        anchors = "".join(
+            f'    <a href="{link}">{link}</a>\n' for link in sorted(links)
+        )
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<body>\n{anchors}"
+                    "</body>\n</html>\n")
+
+
+def l1_error(graph, ranks, exact):
+    """
+    Return the L1 distance between a rank dictionary and an exact rank
+    vector for the same graph.
+    """
+    return float(sum(
+        abs(ranks.get(page, 0) - rank)
+        for page, rank in zip(graph.pages, exact)
+    ))
+
+
+def measure(function, memory):
+    """
+    Call `function` and return (value, seconds, peak bytes allocated),
+    with the peak found by a second, traced call if `memory` is true
+    (tracing slows Python code down, so it is not timed).
+
+    Anything `function` prints is captured and returned with its value.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        start = time.perf_counter()
+        value = function()
+        seconds = time.perf_counter() - start
+
+        peak = None
+        if memory:
+            tracemalloc.start()
+            try:
+                function()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    return (value, output.getvalue()), seconds, peak
+
+
+def run_case(pages, distribution, methods, samples, repeat=1, memory=True,
+             seed=0):
+    """
+    Benchmark each of `methods` on one generated corpus and return a
+    list of result dictionaries, one per method.
+
+    Times are the best of `repeat` runs. Ranks are compared with a power
+    iteration run to EXACT_TOLERANCE.
+    """
+    corpus = generate_links(pages, distribution, seed=seed)
+    graph = LinkGraph.from_corpus(corpus)
+    exact = engine.power_iteration(
+        graph, DAMPING, EXACT_TOLERANCE, max_iterations=1000
+    ).ranks
+    links = int(graph.indptr[-1])
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(corpus, directory)
+        tasks = {
+            "crawl": lambda: pagerank.crawl(directory),
+            "crawler": lambda: crawler.crawl(directory, cache=False),
+            "sample_pagerank": lambda: pagerank.sample_pagerank(
+                corpus, DAMPING, samples
+            ),
+            "iterate_pagerank": lambda: pagerank.iterate_pagerank(
+                corpus, DAMPING
+            ),
+            "power_iteration": lambda: engine.power_iteration(graph),
+            "sample": lambda: sampler.sample(graph, DAMPING, samples,
+                                             seed=seed)
+        }
+
+        results = []
+        for method in methods:
+            best = None
+            for i in range(repeat):
+                (value, output), seconds, peak = measure(
+                    tasks[method], memory and i == 0
+                )
+                best = seconds if best is None else min(best, seconds)
+                if i == 0:
+                    first, printed, peak_memory = value, output, peak
+            result = {
+                "pages": pages,
+                "links": links,
+                "distribution": distribution,
+                "method": method,
+                "seconds": best,
+                "peak_memory": peak_memory,
+                "l1_error": None,
+                "iterations": None
+            }
+            describe(result, method, first, printed, graph, exact, corpus)
+            results.append(result)
+    return results
+
+
+def describe(result, method, value, printed, graph, exact, corpus):
+    """
+    Fill in the error and iteration count of one method's result.
+    """
+    if method in ["crawl", "crawler"]:
+        # Crawling is checked for finding the generated links exactly
+        result["l1_error"] = 0.0 if value == corpus else None
+        return
+    if method == "power_iteration":
+        result["l1_error"] = float(np.abs(value.ranks - exact).sum())
+        result["iterations"] = value.iterations
+    elif method == "sample":
+        result["l1_error"] = float(np.abs(value.ranks - exact).sum())
+    else:
+        result["l1_error"] = l1_error(graph, value, exact)
+    match = re.search(r"stable after (\d+) iterations", printed)
+    if match:
+        result["iterations"] = int(match.group(1))
+
+
+def compare(results, baseline, threshold=1.2):
+    """
+    Return descriptions of results more than `threshold` times slower than
+    the matching result of a baseline report.
+    """
+    key = lambda r: (r["pages"], r["distribution"], r["method"])
+    previous = {key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(key(result))
+        if old is None or result["seconds"] < MIN_SECONDS:
+            continue
+        ratio = result["seconds"] / max(old["seconds"], MIN_SECONDS)
+        if ratio > threshold:
+            regressions.append(
+                f"{result['method']} on {result['pages']} "
+                f"{result['distribution']} pages: {old['seconds']:.4f}s -> "
+                f"{result['seconds']:.4f}s ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark PageRank methods on generated corpora."
+    )
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000])
+    parser.add_argument("--distribution", nargs="+", choices=DISTRIBUTIONS,
+                        default=DISTRIBUTIONS)
+    parser.add_argument("--methods", nargs="+", choices=METHODS,
+                        default=METHODS)
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the traced runs measuring peak memory")
+    parser.add_argument("--output", help="file to write the JSON report to")
+    parser.add_argument("--baseline",
+                        help="earlier report to check for slowdowns against")
+    args = parser.parse_args()
+
+    results = []
+    for pages in args.pages:
+        for distribution in args.distribution:
+            for result in run_case(pages, distribution, args.methods,
+                                   args.samples, args.repeat,
+                                   not args.no_memory, args.seed):
+                error = result["l1_error"]
+                print(f"{pages:>8} {distribution:<8} {result['method']:<16} "
+                      f"{result['seconds']:9.4f}s  L1 "
+                      + ("-" if error is None else f"{error:.2e}"))
+                results.append(result)
+
+    report = {
+        "version": REPORT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "damping": DAMPING,
+            "samples": args.samples,
+            "repeat": args.repeat,
+            "seed": args.seed
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        for regression in regressions:
+            print(f"Slower: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
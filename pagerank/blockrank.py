@@ -0,0 +1,124 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from engine import MAX_ITERATIONS, TOLERANCE, Result
+from linkgraph import LinkGraph
+from pagerank import DAMPING
+
+# Links read from disk at a time; only one block and the one being read
+# ahead are in memory besides the rank vectors
+BLOCK_LINKS = 1 << 22
+
+
+def block_ranges(indptr, block_links=BLOCK_LINKS):
+    """
+    Split the pages of a graph into consecutive (start, end) ranges with
+    about `block_links` links each, reading only the row offsets at the
+    boundaries.
+    """
+    n = len(indptr) - 1
+    ranges = []
+    start = 0
+    while start < n:
+        limit = int(indptr[start]) + block_links
+        end = int(np.searchsorted(indptr, limit, side="right")) - 1
+        end = min(max(end, start + 1), n)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def read_block(graph, start, end):
+    """
+    Copy the links out of pages `start` to `end` from a memory-mapped
+    graph, returning (out-degrees, link targets) for those pages.
+    """
+    offsets = np.array(graph.indptr[start:end + 1])
+    targets = np.array(graph.indices[offsets[0]:offsets[-1]])
+    return np.diff(offsets), targets
+
+
+def block_power_iteration(graph, damping_factor=DAMPING,
+                          tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                          block_links=BLOCK_LINKS, report=None):
+    """
+    Compute PageRank for a LinkGraph, usually one memory-mapped with
+    `LinkGraph.open`, by power iteration over blocks of links streamed
+    from disk. Gives the same ranks as `engine.power_iteration`.
+
+    Only the rank vectors and the share of rank each page passes along
+    each link stay in memory. Every sweep reads the graph block by
+    block, with a thread reading the next block while the current one
+    pushes each page's rank along its links.
+    """
+    n = len(graph)
+    if n == 0:
+        return Result(np.zeros(0), [], True)
+    ranges = block_ranges(graph.indptr, block_links)
+
+    with ThreadPoolExecutor(1) as reader:
+        # One pass to find each page's share of rank per link
+        share = np.zeros(n)
+        for start, end in ranges:
+            degrees = np.diff(graph.indptr[start:end + 1])
+            linked = degrees > 0
+            share[start:end][linked] = 1 / degrees[linked]
+        dangling = share == 0
+
+        ranks = np.full(n, 1 / n)
+        residuals = []
+        converged = False
+        for iteration in range(1, max_iterations + 1):
+            new_ranks = np.zeros(n)
+            pending = reader.submit(read_block, graph, *ranges[0])
+            for i, (start, end) in enumerate(ranges):
+                degrees, targets = pending.result()
+                if i + 1 < len(ranges):
+                    pending = reader.submit(read_block, graph, *ranges[i + 1])
+                passed = np.repeat(ranks[start:end] * share[start:end],
+                                   degrees)
+                np.add.at(new_ranks, targets, passed)
+
+            teleport = (1 - damping_factor) / n
+            teleport += damping_factor * ranks[dangling].sum() / n
+            new_ranks *= damping_factor
+            new_ranks += teleport
+            residual = float(np.abs(new_ranks - ranks).sum())
+            ranks = new_ranks
+            residuals.append(residual)
+            if report is not None:
+                report(iteration, residual)
+            if residual < tolerance:
+                converged = True
+                break
+
+    return Result(ranks / ranks.sum(), residuals, converged)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="PageRank for a link graph file too large for memory."
+    )
+    parser.add_argument("graph", help="link graph file from crawler.py")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--max-iterations", type=int, default=MAX_ITERATIONS)
+    parser.add_argument("--block-links", type=int, default=BLOCK_LINKS)
+    parser.add_argument("--top", type=int, default=20,
+                        help="number of highest-ranked pages to print")
+    args = parser.parse_args()
+
+    graph = LinkGraph.open(args.graph)
+    report = lambda i, r: print(f"  Iteration {i}: residual {r:.3e}")
+    result = block_power_iteration(graph, DAMPING, args.tolerance,
+                                   args.max_iterations, args.block_links,
+                                   report)
+    status = "Converged" if result.converged else "Stopped"
+    print(f"{status} after {result.iterations} iterations.")
+    for i in np.argsort(-result.ranks, kind="stable")[:args.top]:
+        print(f"  {graph.pages[i]}: {result.ranks[i]:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import codecs
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+
+from linkgraph import LinkGraph
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Bytes read from a page at a time while extracting links
+CHUNK_SIZE = 1 << 16
+
+# Longest unfinished tag carried over between chunks
+MAX_TAG = 1 << 16
+
+# Per-file results are cached in the corpus directory under this name,
+# and a cache written by another format version is ignored
+CACHE_NAME = ".crawl-cache.json"
+CACHE_VERSION = 1
+
+
+def extract_links(path):
+    """
+    Stream an HTML file in chunks, returning (links, digest) where
+    `links` is the list of link targets found and `digest` is the SHA-1
+    of the file's bytes.
+
+    Only an unfinished tag at the end of a chunk is carried over to the
+    next, since a link never spans a `>`, so memory stays bounded by
+    CHUNK_SIZE and MAX_TAG.
+    """
+    links = []
+    digest = hashlib.sha1()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    carry = ""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            digest.update(chunk)
+            text = carry + decoder.decode(chunk, final=not chunk)
+            if not chunk:
+                links.extend(LINK.findall(text))
+                break
+            # Carry over from the last `<` after the last `>`, if any; a
+            # tag longer than MAX_TAG is dropped rather than carried
+            cut = text.rfind("<")
+            if cut <= text.rfind(">") or len(text) - cut > MAX_TAG:
+                cut = len(text)
+            links.extend(LINK.findall(text, 0, cut))
+            carry = text[cut:]
+    return links, digest.hexdigest()
+
+
+def file_digest(path):
+    """
+    Return the SHA-1 of a file's bytes, reading it in chunks.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_worker(task):
+    """
+    Extract links for one (filename, path, digest) task in a pool
+    worker. If the file still has the SHA-1 `digest` of an earlier
+    parse, its links are not extracted again and None is returned in
+    their place.
+    """
+    filename, path, digest = task
+    if digest is not None and file_digest(path) == digest:
+        return filename, None, digest
+    links, digest = extract_links(path)
+    return filename, links, digest
+
+
+def parse_all(tasks, processes=None):
+    """
+    Yield (filename, links, digest) for each (filename, path, digest)
+    task, in a pool of worker processes unless `processes` is 1.
+    """
+    if processes == 1 or len(tasks) == 1:
+        yield from map(parse_worker, tasks)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(parse_worker, tasks, chunksize=64)
+
+
+def load_cache(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache["files"]
+
+
+def save_cache(path, files):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "files": files}, f)
+        os.replace(temporary, path)
+    except OSError:
+        # A read-only corpus just means no cache
+        pass
+
+
+def crawl(directory, processes=None, cache=True):
+    """
+    Parse a directory of HTML pages and check for links to other pages.
+    Return a dictionary where each key is a page, and values are
+    a set of all other pages in the corpus that are linked to by the page,
+    the same as `pagerank.crawl`.
+
+    Pages are parsed in a pool of `processes` worker processes. With
+    `cache`, the links found in each file are kept in a cache file in
+    `directory` along with the file's size, modification time and SHA-1
+    hash. A file is only read again if its size or modification time
+    changed, and only parsed again if its hash changed too.
+    """
+    cache_path = os.path.join(directory, CACHE_NAME)
+    cached = load_cache(cache_path) if cache else {}
+
+    files = {}
+    stale = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".html") or not entry.is_file():
+            continue
+        stat = entry.stat()
+        record = cached.get(entry.name)
+        if (record is not None and record["size"] == stat.st_size
+                and record["mtime"] == stat.st_mtime_ns):
+            files[entry.name] = record
+        else:
+            files[entry.name] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns
+            }
+
+            # A file of the same size may only have been touched
+            digest = None
+            if record is not None and record["size"] == stat.st_size:
+                digest = record["hash"]
+            stale.append((entry.name, entry.path, digest))
+
+    if stale:
+        for filename, links, digest in parse_all(stale, processes):
+            files[filename]["hash"] = digest
+            if links is None:
+                files[filename]["links"] = cached[filename]["links"]
+            else:
+                files[filename]["links"] = sorted(set(links))
+        if cache:
+            save_cache(cache_path, files)
+
+    # Only include links to other pages in the corpus
+    return {
+        filename: {
+            link for link in record["links"]
+            if link in files and link != filename
+        }
+        for filename, record in files.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the links between a directory of HTML pages."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("processes", nargs="?", type=int)
+    parser.add_argument("--output",
+                        help="link graph file to write for the rankers")
+    args = parser.parse_args()
+
+    corpus = crawl(args.corpus, args.processes)
+    links = sum(len(links) for links in corpus.values())
+    print(f"Crawled {len(corpus)} pages with {links} links.")
+    if args.output:
+        LinkGraph.from_corpus(corpus).save(args.output)
+        print(f"Wrote link graph to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import json
+from bisect import bisect_left
+
+import numpy as np
+
+from linkgraph import LinkGraph, load
+from pagerank import DAMPING
+
+TOLERANCE = 1e-10
+MAX_ITERATIONS = 1000
+
+
+class Result():
+    """
+    Ranks found by power iteration, with the number of iterations run
+    and the L1 change in ranks after each of them.
+    """
+
+    def __init__(self, ranks, residuals, converged, updates=0):
+        self.ranks = ranks
+        self.residuals = residuals
+        self.converged = converged
+
+        # Page updates made in region sweeps before iterating, by `update`
+        self.updates = updates
+
+    @property
+    def iterations(self):
+        return len(self.residuals)
+
+
+def power_iteration(graph, damping_factor=DAMPING, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, start=None, report=None):
+    """
+    Compute PageRank for a LinkGraph by power iteration with a sparse
+    matrix, stopping once the L1 change in ranks falls below `tolerance`
+    or after `max_iterations` sweeps.
+
+    Pages without links are treated as linking to every page. `start` is
+    an optional initial rank vector, uniform by default. If given,
+    `report(iteration, residual)` is called after every sweep.
+    """
+    n = len(graph)
+    if n == 0:
+        return Result(np.zeros(0), [], True)
+
+    incoming = graph.incoming()
+    degrees = graph.out_degrees()
+    dangling = degrees == 0
+
+    # Share of rank each page passes along each of its links
+    share = np.zeros(n)
+    share[~dangling] = 1 / degrees[~dangling]
+
+    ranks = np.full(n, 1 / n) if start is None else start / start.sum()
+    residuals = []
+    converged = False
+    for iteration in range(1, max_iterations + 1):
+        teleport = (1 - damping_factor) / n
+        teleport += damping_factor * ranks[dangling].sum() / n
+        new_ranks = damping_factor * (incoming @ (ranks * share)) + teleport
+        residual = float(np.abs(new_ranks - ranks).sum())
+        ranks = new_ranks
+        residuals.append(residual)
+        if report is not None:
+            report(iteration, residual)
+        if residual < tolerance:
+            converged = True
+            break
+
+    return Result(ranks / ranks.sum(), residuals, converged)
+
+
+def pagerank(corpus, damping_factor=DAMPING, tolerance=TOLERANCE,
+             max_iterations=MAX_ITERATIONS):
+    """
+    Return PageRank values for a corpus dictionary as returned by `crawl`,
+    in the same form as `iterate_pagerank`.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    result = power_iteration(graph, damping_factor, tolerance, max_iterations)
+    return graph.ranks_to_dict(result.ranks)
+
+
+def affected_pages(old_corpus, new_corpus):
+    """
+    Return the pages of `new_corpus` whose rank is directly affected by
+    link changes since `old_corpus`: pages that were added or whose links
+    changed, and every page they link to or used to link to.
+    """
+    affected = set()
+    for page, links in new_corpus.items():
+        old_links = old_corpus.get(page)
+        if old_links != links:
+            affected.add(page)
+            affected.update(links)
+            affected.update(old_links or ())
+    for page, old_links in old_corpus.items():
+        if page not in new_corpus:
+            affected.update(old_links)
+    return affected & set(new_corpus)
+
+
+def update(graph, previous, affected=None, damping_factor=DAMPING,
+           tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, report=None):
+    """
+    Recompute PageRank for a LinkGraph after its links changed, starting
+    from `previous`, a dictionary of earlier ranks by page name.
+
+    Pages missing from `previous` start at 1 / N. If `affected` is given
+    (see `affected_pages`), sweeps first update only a region of pages,
+    starting with the affected ones and growing along the links of any
+    page whose change is still above tolerance / N. Power iteration over
+    the whole graph then continues from the result until it converges,
+    which takes few sweeps when the changes were local.
+    """
+    n = len(graph)
+    start = np.array([previous.get(page, -1.0) for page in graph.pages])
+    new_pages = start < 0
+    start[new_pages] = 1 / n
+    start /= start.sum()
+    if affected is None or n == 0:
+        return power_iteration(graph, damping_factor, tolerance,
+                               max_iterations, start, report)
+
+    # Adding or removing pages changes every page's teleport share
+    region = np.zeros(n, dtype=bool)
+    if new_pages.any() or len(previous) != n:
+        region[:] = True
+    else:
+        region[[bisect_left(graph.pages, page) for page in affected]] = True
+
+    adjacency = graph.adjacency()
+    incoming = graph.incoming()
+    degrees = graph.out_degrees()
+    dangling = degrees == 0
+    share = np.zeros(n)
+    share[~dangling] = 1 / degrees[~dangling]
+
+    ranks = start
+    threshold = tolerance / n
+    updates = 0
+    pages = np.flatnonzero(region)
+    rows = incoming[pages]
+    for _ in range(max_iterations):
+        # Past half the graph, sweeping everything is cheaper
+        if len(pages) == 0 or len(pages) > n // 2:
+            break
+        teleport = (1 - damping_factor) / n
+        teleport += damping_factor * ranks[dangling].sum() / n
+        new_ranks = damping_factor * (rows @ (ranks * share)) + teleport
+        change = np.abs(new_ranks - ranks[pages])
+        ranks[pages] = new_ranks
+        updates += len(pages)
+        if change.max() <= threshold:
+            break
+
+        # Grow the region along links that still pass on a real change
+        spreading = pages[change * damping_factor * share[pages] > threshold]
+        reached = adjacency[spreading].indices
+        if not region[reached].all():
+            region[reached] = True
+            pages = np.flatnonzero(region)
+            rows = incoming[pages]
+
+    result = power_iteration(graph, damping_factor, tolerance,
+                             max_iterations, ranks, report)
+    result.updates = updates
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="PageRank by power iteration."
+    )
+    parser.add_argument("corpus",
+                        help="directory of pages or link graph file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--max-iterations", type=int, default=MAX_ITERATIONS)
+    parser.add_argument("--previous",
+                        help="ranks file from an earlier run to start from")
+    parser.add_argument("--save", help="file to write ranks and links to")
+    parser.add_argument("--local", action="store_true",
+                        help="with --previous, first update only the pages "
+                             "near changed links")
+    args = parser.parse_args()
+
+    graph = load(args.corpus)
+    corpus = graph.to_corpus() if args.previous or args.save else None
+    report = lambda i, r: print(f"  Iteration {i}: residual {r:.3e}")
+    if args.previous:
+        with open(args.previous) as f:
+            previous = json.load(f)
+        old_corpus = {
+            page: set(links) for page, links in previous["links"].items()
+        }
+        affected = affected_pages(old_corpus, corpus) if args.local else None
+        result = update(graph, previous["ranks"], affected, DAMPING,
+                        args.tolerance, args.max_iterations, report)
+        if args.local:
+            print(f"Updated {result.updates} pages before iterating.")
+    else:
+        result = power_iteration(graph, DAMPING, args.tolerance,
+                                 args.max_iterations, report=report)
+    status = "Converged" if result.converged else "Stopped"
+    print(f"{status} after {result.iterations} iterations.")
+
+    ranks = graph.ranks_to_dict(result.ranks)
+    if args.save:
+        with open(args.save, "w") as f:
+            links = {page: sorted(corpus[page]) for page in corpus}
+            json.dump({"ranks": ranks, "links": links}, f)
+    for page, rank in sorted(ranks.items()):
+        print(f"  {page}: {rank:.4f}")
+
+
+if __name__ == "__main__":
+    main()
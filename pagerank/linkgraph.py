@@ -0,0 +1,221 @@
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+import scipy.sparse
+
+# Link graph files start with this magic string, followed by the length
+# of a JSON header giving the format version and where each array lives
+# in the file, then the arrays themselves, each aligned to 8 bytes
+MAGIC = b"LINKGRPH"
+VERSION = 1
+SECTIONS = ["indptr", "indices", "name_offsets", "name_data"]
+
+
+class PageNames():
+    """
+    A read-only sequence of page names packed into one buffer of UTF-8
+    bytes, with `offsets[i]:offsets[i + 1]` delimiting the i-th name.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_names(cls, names):
+        """
+        Pack a list of page names into a new sequence.
+        """
+        encoded = [name.encode("utf-8") for name in names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(name) for name in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("page index out of range")
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.data[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class LinkGraph():
+    """
+    A corpus of linked pages with page names interned to integers.
+
+    `pages` lists page names in sorted order, and the links out of page
+    `i` are `indices[indptr[i]:indptr[i + 1]]`, in compressed sparse
+    row form.
+    """
+
+    def __init__(self, pages, indptr, indices):
+        self.pages = pages
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a graph from a corpus dictionary as returned by `crawl`,
+        mapping each page to the set of pages it links to.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        indptr = np.zeros(len(pages) + 1, dtype=np.int64)
+        indices = []
+        for i, page in enumerate(pages):
+            links = sorted(index[link] for link in corpus[page])
+            indices.extend(links)
+            indptr[i + 1] = len(indices)
+        return cls(pages, indptr, np.array(indices, dtype=np.int32))
+
+    @classmethod
+    def open(cls, filename):
+        """
+        Memory-map a link graph file written by `save`. Arrays are read
+        from the file as they are used, so opening it is immediate and
+        pages that are never touched are never loaded.
+        """
+        with open(filename, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise Exception(f"{filename} is not a link graph file.")
+            size, = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(size))
+            start = align(len(MAGIC) + 8 + size)
+            if header["version"] != VERSION:
+                raise Exception(
+                    f"{filename} has unsupported version {header['version']}."
+                )
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        arrays = {}
+        for name, (offset, count, dtype) in header["sections"].items():
+            arrays[name] = np.frombuffer(
+                buffer, dtype=dtype, count=count, offset=start + offset
+            )
+        pages = PageNames(arrays["name_data"], arrays["name_offsets"])
+        return cls(pages, arrays["indptr"], arrays["indices"])
+
+    def save(self, filename):
+        """
+        Write the graph to a compact binary file that `LinkGraph.open` can
+        memory-map: little-endian int64 row offsets, int32 page ids for
+        the links, and the page names as offsets into UTF-8 bytes.
+        """
+        if isinstance(self.pages, PageNames):
+            names = self.pages
+        else:
+            names = PageNames.from_names(self.pages)
+        arrays = {
+            "indptr": np.asarray(self.indptr, dtype="<i8"),
+            "indices": np.asarray(self.indices, dtype="<i4"),
+            "name_offsets": np.asarray(names.offsets, dtype="<i8"),
+            "name_data": np.asarray(names.data, dtype=np.uint8)
+        }
+
+        # Sections follow the header in order, each aligned to 8 bytes,
+        # at offsets counted from the end of the header
+        layout = {}
+        position = 0
+        for name in SECTIONS:
+            values = arrays[name]
+            layout[name] = [position, len(values), values.dtype.str]
+            position += align(values.nbytes)
+        header = json.dumps({
+            "version": VERSION,
+            "pages": len(self),
+            "links": len(self.indices),
+            "sections": layout
+        }).encode("utf-8")
+        start = align(len(MAGIC) + 8 + len(header))
+
+        # Write to a temporary file first so readers never see half a file
+        temporary = f"{filename}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            f.write(bytes(start - f.tell()))
+            for name in SECTIONS:
+                values = arrays[name]
+                values.tofile(f)
+                f.write(bytes(align(values.nbytes) - values.nbytes))
+        os.replace(temporary, filename)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def to_corpus(self):
+        """
+        Return the graph as a corpus dictionary.
+        """
+        return {
+            page: {self.pages[j] for j in self.links(i)}
+            for i, page in enumerate(self.pages)
+        }
+
+    def links(self, i):
+        """
+        Return the indices of the pages linked to by page `i`.
+        """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def out_degrees(self):
+        """
+        Return the number of links out of each page.
+        """
+        return np.diff(self.indptr)
+
+    def adjacency(self):
+        """
+        Return the sparse matrix with a 1 at (i, j) if page i links to j.
+        """
+        n = len(self.pages)
+        data = np.ones(len(self.indices), dtype=np.float64)
+        return scipy.sparse.csr_matrix(
+            (data, self.indices, self.indptr), shape=(n, n)
+        )
+
+    def incoming(self):
+        """
+        Return the sparse matrix with a 1 at (j, i) if page i links to j,
+        so multiplying it by a vector sums each page's incoming values.
+        """
+        return self.adjacency().T.tocsr()
+
+    def ranks_to_dict(self, ranks):
+        """
+        Return a rank vector as a dictionary keyed by page name.
+        """
+        return {page: float(rank) for page, rank in zip(self.pages, ranks)}
+
+
+def align(size):
+    """
+    Round `size` up to a multiple of 8 bytes.
+    """
+    return (size + 7) // 8 * 8
+
+
+def load(path):
+    """
+    Return the LinkGraph for `path`, either a link graph file written by
+    `LinkGraph.save` or a directory of HTML pages to crawl with
+    `crawler.crawl`, in parallel and reusing its cache.
+    """
+    if os.path.isdir(path):
+        # crawler imports this module, so it is imported only when needed
+        from crawler import crawl
+        return LinkGraph.from_corpus(crawl(path))
+    return LinkGraph.open(path)
@@ -108,31 +108,30 @@ def sample_pagerank(corpus, damping_factor, n):
     for page in corpus:
         sample_PR[page] = 0
 
+    #Building the choices once, since the transition model is always a mix of two uniform draws
+    choices = list(corpus.keys())
+    links = {page: list(corpus[page]) for page in corpus}
+
     #Starting the sample at none
     sample = None
 
     for iteration in range(n):
         #If in first round the sample is none
         if sample == None:
-            #List with all choices
-            choices = list(corpus.keys())
             #Choose a sample randomly with random.choice at equal probability
             sample = random.choice(choices)
-            sample_PR[sample] += 1
+        #With probability damping_factor follow one of the current page's links, if it has any
+        elif links[sample] and random.random() < damping_factor:
+            sample = random.choice(links[sample])
+        #Otherwise jump to any page in the corpus, same as transition_model
         else:
-            #Getting the probability distribution based on current sample
-            next_sample_prob = transition_model(corpus, sample, damping_factor)
-            #List with all possible choices
-            choices = list(next_sample_prob.keys())
-            #Getting the weight for choice in choices based 
-            weights = [next_sample_prob[key] for key in choices]
-            sample = random.choices(choices, weights).pop()
-            sample_PR[sample] += 1
+            sample = random.choice(choices)
+        sample_PR[sample] += 1
     #After finishing sampling, to get the percentages, divide stored values by number of iterations
     sample_PR  = {key: value/n for key, value in sample_PR.items()}
     #Checking if the dictionary values add up to 1
     if round(sum(sample_PR.values()), 5) != 1:
-        print(f"Error! Probabilities add up to {sum(trans_mod.values())}")
+        print(f"Error! Probabilities add up to {sum(sample_PR.values())}")
     else:
         print(f"Sum of sample_pagerank values: {round(sum(sample_PR.values()), 10)}")
     return sample_PR
@@ -153,39 +152,40 @@ def iterate_pagerank(corpus, damping_factor):
     #Iterating over all corpus pages assigning 1 dividing by the number of pages
     for page in corpus:
         iterate_PR[page] = 1/ num_pages
-    
+
+    #Grabing "parent" pages that link to each page once, instead of every iteration
+    parents = {page: [] for page in corpus}
+    for link in corpus:
+        for page in corpus[link]:
+            parents[page].append(link)
+    #Pages without links count as linking to every page, including themselves
+    dangling = [page for page in corpus if len(corpus[page]) == 0]
+
     changes = 1
-    iterations = 1
+    iterations = 0
     while changes >= 0.001:
         #Reseting changes value
         changes = 0
         #Copying the current state to calculate new probabilities without new calculated values
         previous_state = iterate_PR.copy()
+        #Adding the first part of the equation, plus what pages without links spread evenly
+        firsteq = (1 - damping_factor) / num_pages
+        firsteq += damping_factor * sum(previous_state[page] for page in dangling) / num_pages
         #Iterating over pages
         for page in iterate_PR:
-            #Grabing "parent" pages that link to the current page
-            parents = [link for link in corpus if page in corpus[link]]
-            #Adding the first part of the equation
-            firsteq = ((damping_factor - 1)/num_pages)
             #Adding the secound part of the equation by iterating over parents
-            secondeq = []
-
-            if len(parents) != 0:
-                for parent in parents:
-                    #Gathering links starting from parent page
-                    num_links = len(corpus[parent])
-                    val = previous_state[parent] / num_links
-                    secondeq.append(val)
-
-        #Summing values of second list together
-        secondeq=sum(secondeq)
-        iterate_PR[page] = firsteq + (damping_factor * secondeq)
-        #Calculating the the change during iteration
-        new_change = abs(iterate_PR[page] - previous_state[page])
-        #Updating change value if new_change value if larger
-        if changes < new_change:
-            changes = new_change
-    iterations += 1
+            secondeq = 0
+            for parent in parents[page]:
+                #Gathering links starting from parent page
+                num_links = len(corpus[parent])
+                secondeq += previous_state[parent] / num_links
+            iterate_PR[page] = firsteq + (damping_factor * secondeq)
+            #Calculating the the change during iteration
+            new_change = abs(iterate_PR[page] - previous_state[page])
+            #Updating change value if new_change value if larger
+            if changes < new_change:
+                changes = new_change
+        iterations += 1
     #Normalizing values
     dictsum = sum(iterate_PR.values())
     iterate_PR = {key: value/dictsum for key, value in iterate_PR.items()}
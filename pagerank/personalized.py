@@ -0,0 +1,156 @@
+import argparse
+
+import numpy as np
+import scipy.sparse
+
+from engine import MAX_ITERATIONS, TOLERANCE, Result
+from linkgraph import LinkGraph, load
+from pagerank import DAMPING
+
+
+def teleport_matrix(graph, seeds):
+    """
+    Return a sparse N x K matrix whose columns are the teleport
+    distributions for K seeds. Each seed is either a collection of page
+    names, teleported to uniformly, or a dictionary mapping page names to
+    weights.
+    """
+    index = {page: i for i, page in enumerate(graph.pages)}
+    rows = []
+    columns = []
+    data = []
+    for column, seed in enumerate(seeds):
+        weights = seed if isinstance(seed, dict) else dict.fromkeys(seed, 1)
+        total = 0
+        for page, weight in weights.items():
+            if page not in index:
+                raise Exception(f"Page {page} not in corpus.")
+            if weight < 0:
+                raise Exception(f"Negative teleport weight for {page}.")
+            total += weight
+        if total == 0:
+            raise Exception("Teleport distribution has no weight.")
+        for page, weight in weights.items():
+            rows.append(index[page])
+            columns.append(column)
+            data.append(weight / total)
+    return scipy.sparse.coo_matrix(
+        (data, (rows, columns)), shape=(len(graph), len(seeds))
+    ).tocsc()
+
+
+def personalized_iteration(graph, teleport, damping_factor=DAMPING,
+                           tolerance=TOLERANCE,
+                           max_iterations=MAX_ITERATIONS):
+    """
+    Compute personalized PageRank for a LinkGraph and every column of
+    `teleport` (see `teleport_matrix`) at once, by power iteration with
+    one sparse matrix-matrix product per sweep.
+
+    A random surfer that stops following links, or reaches a page without
+    links, jumps according to its column's teleport distribution. Each
+    column stops once its L1 change falls below `tolerance`. The
+    result's ranks are an N x K array and each residual is the largest
+    change of any column in that sweep.
+    """
+    n, k = teleport.shape
+    if n == 0 or k == 0:
+        return Result(np.zeros((n, k)), [], True)
+
+    # Column j of the transition matrix holds page j's share of rank
+    # for each page it links to
+    degrees = graph.out_degrees()
+    dangling = degrees == 0
+    share = np.zeros(n)
+    share[~dangling] = 1 / degrees[~dangling]
+    transition = (graph.incoming() @ scipy.sparse.diags(share)).tocsr()
+
+    # Columns still iterating, with their teleport distributions, which
+    # are usually small enough to add entry by entry
+    result = np.zeros((n, k))
+    active = np.arange(k)
+    jumps = scipy.sparse.csc_matrix(teleport).tocoo()
+    jumps.sum_duplicates()
+    ranks = jumps.toarray()
+
+    residuals = []
+    for _ in range(max_iterations):
+        jumping = damping_factor * ranks[dangling].sum(0)
+        jumping += 1 - damping_factor
+        new_ranks = transition @ ranks
+        new_ranks *= damping_factor
+        new_ranks[jumps.row, jumps.col] += jumps.data * jumping[jumps.col]
+
+        ranks -= new_ranks
+        change = np.abs(ranks, out=ranks).sum(0)
+        ranks = new_ranks
+        residuals.append(float(change.max()))
+
+        # Set converged columns aside
+        done = change < tolerance
+        if done.any():
+            result[:, active[done]] = ranks[:, done]
+            keep = np.flatnonzero(~done)
+            active = active[keep]
+            if len(active) == 0:
+                break
+            ranks = ranks[:, keep]
+            jumps = scipy.sparse.csc_matrix(jumps)[:, keep].tocoo()
+
+    result[:, active] = ranks
+    return Result(result / result.sum(0), residuals, len(active) == 0)
+
+
+def personalized_pagerank(corpus, seeds, damping_factor=DAMPING,
+                          tolerance=TOLERANCE,
+                          max_iterations=MAX_ITERATIONS):
+    """
+    Return a list with one dictionary of personalized PageRank values
+    per seed, for a corpus dictionary as returned by `crawl`.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    result = personalized_iteration(
+        graph, teleport_matrix(graph, seeds),
+        damping_factor, tolerance, max_iterations
+    )
+    return [graph.ranks_to_dict(column) for column in result.ranks.T]
+
+
+def related_pages(graph, ranks, seed, limit=10):
+    """
+    Return up to `limit` (page, rank) pairs outside `seed` with the
+    highest rank in one column of personalized ranks, best first.
+    """
+    order = np.argsort(-ranks, kind="stable")
+    related = []
+    for i in order:
+        if len(related) == limit:
+            break
+        if graph.pages[i] not in seed:
+            related.append((graph.pages[i], float(ranks[i])))
+    return related
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pages related to each set of seed pages, "
+                    "by personalized PageRank."
+    )
+    parser.add_argument("corpus",
+                        help="directory of pages or link graph file")
+    parser.add_argument("seeds", nargs="+",
+                        help="comma-separated seed pages, one set per topic")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    graph = load(args.corpus)
+    seeds = [set(seed.split(",")) for seed in args.seeds]
+    result = personalized_iteration(graph, teleport_matrix(graph, seeds))
+    for seed, column in zip(seeds, result.ranks.T):
+        print(f"Related to {', '.join(sorted(seed))}")
+        for page, rank in related_pages(graph, column, seed, args.limit):
+            print(f"  {page}: {rank:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import multiprocessing
+import sys
+
+import numpy as np
+
+from linkgraph import load
+from pagerank import DAMPING, SAMPLES
+
+# Random surfers advanced together in each batch
+WALKERS = 1024
+
+# Independent batches the samples are split into, used both to spread
+# work across processes and to estimate the standard error of each rank
+BATCHES = 8
+
+
+class Result():
+    """
+    Ranks estimated by sampling, with the standard error of each rank
+    across independent batches and the total number of samples taken.
+    """
+
+    def __init__(self, ranks, errors, samples):
+        self.ranks = ranks
+        self.errors = errors
+        self.samples = samples
+
+    def interval(self, z=1.96):
+        """
+        Return (low, high) arrays bounding each rank, by default with
+        95% confidence.
+        """
+        return self.ranks - z * self.errors, self.ranks + z * self.errors
+
+
+def walk(indptr, indices, damping_factor, samples, walkers, seed):
+    """
+    Draw `samples` pages from the PageRank distribution of a graph in
+    compressed sparse row form with random surfers, and return how many
+    times each page was drawn.
+
+    Each surfer starts on a random page and, at every step, stops with
+    probability 1 - `damping_factor`; otherwise it follows a random link
+    of the current page, or jumps to a random page if it has none. The
+    page a surfer stops on is an exact draw from PageRank, so samples
+    are independent and unbiased. Surfers walk in rounds of `walkers` at
+    a time. Every step costs O(1) per surfer, with no per-page
+    probability table.
+    """
+    if not 0 <= damping_factor < 1:
+        raise Exception("Damping factor must be at least 0 and below 1.")
+    n = len(indptr) - 1
+    rng = np.random.default_rng(seed)
+    degrees = np.diff(indptr)
+    if len(indices) == 0:
+        # Lookups below need an entry even though no link is followed
+        indices = np.zeros(1, dtype=np.int32)
+    counts = np.zeros(n, dtype=np.int64)
+
+    taken = 0
+    while taken < samples:
+        # Start a round of surfers and walk each until it stops; a round
+        # is never cut short, as stopping everyone at a fixed step would
+        # favour the short walks that end near the uniform start
+        pages = rng.integers(n, size=min(walkers, samples - taken))
+        taken += len(pages)
+        while len(pages):
+            stop = rng.random(len(pages)) >= damping_factor
+            np.add.at(counts, pages[stop], 1)
+            pages = pages[~stop]
+
+            # Choose the next page for every surfer still walking
+            degree = degrees[pages]
+            follow = degree > 0
+            link = indptr[pages] + (
+                rng.random(len(pages)) * degree
+            ).astype(np.int64)
+            jump = rng.integers(n, size=len(pages))
+            pages = np.where(follow, indices[np.where(follow, link, 0)], jump)
+
+    return counts
+
+
+# Graph arrays of the current worker process in `sample`
+worker_graph = None
+
+
+def init_worker(indptr, indices):
+    global worker_graph
+    worker_graph = (indptr, indices)
+
+
+def walk_worker(task):
+    """
+    Run one batch of `walk` in a pool worker.
+    """
+    damping_factor, samples, walkers, seed = task
+    indptr, indices = worker_graph
+    return walk(indptr, indices, damping_factor, samples, walkers, seed)
+
+
+def sample(graph, damping_factor=DAMPING, n=SAMPLES, walkers=WALKERS,
+           batches=BATCHES, processes=None, seed=None):
+    """
+    Estimate PageRank for a LinkGraph from `n` samples, split across
+    `batches` independent batches of random surfers, each with its own
+    seed derived from `seed`. With `processes`, batches run in a pool
+    of that many worker processes.
+    """
+    if len(graph) == 0:
+        return Result(np.zeros(0), np.zeros(0), 0)
+
+    batches = max(1, min(batches, n))
+    seeds = np.random.SeedSequence(seed).spawn(batches)
+    tasks = [
+        (damping_factor, n // batches + (i < n % batches), walkers, seeds[i])
+        for i in range(batches)
+    ]
+    if processes is None:
+        counts = [
+            walk(graph.indptr, graph.indices, *task)
+            for task in tasks
+        ]
+    else:
+        with multiprocessing.Pool(
+            processes, init_worker, (graph.indptr, graph.indices)
+        ) as pool:
+            counts = pool.map(walk_worker, tasks)
+
+    counts = np.array(counts, dtype=np.float64)
+    sizes = np.array([task[1] for task in tasks], dtype=np.float64)
+    ranks = counts.sum(axis=0) / n
+
+    # Standard error of the mean of the batch estimates
+    if batches > 1:
+        estimates = counts / sizes[:, None]
+        errors = estimates.std(axis=0, ddof=1) / np.sqrt(batches)
+    else:
+        errors = np.full(len(graph), np.nan)
+    return Result(ranks, errors, n)
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python sampler.py corpus [samples] [processes]")
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else SAMPLES
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    graph = load(sys.argv[1])
+    result = sample(graph, DAMPING, n, processes=processes)
+    print(f"PageRank Results from Sampling (n = {n})")
+    for page, rank, error in zip(graph.pages, result.ranks, result.errors):
+        print(f"  {page}: {rank:.4f} ± {1.96 * error:.4f}")
+
+
+if __name__ == "__main__":
+    main()